@@ -0,0 +1,119 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+from sqlalchemy import update
+
+from .config import Config
+from .fileio import FileLock
+from .models import db, Blob
+
+READ_SIZE = 1024 * 1024
+_BLOB_NAME = re.compile(r"^([0-9a-f]{64})(\.[A-Za-z0-9]+)?$")
+
+
+class BlobStore:
+    """
+    Uploaded files stored once per content, at <folder>/<key[:2]>/<key> where
+    key is the SHA-256 of the bytes. The blob table counts the rows pointing
+    at each blob; the file is unlinked when the last one is released.
+
+    Adding and releasing hold one cross-process lock, so a blob can't be
+    unlinked between another upload finding it on disk and taking its ref.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.tmp_folder = os.path.join(folder, "tmp")
+        os.makedirs(self.tmp_folder, exist_ok=True)
+        self.lock = FileLock(os.path.join(folder, "blobs"))
+
+    def path(self, key):
+        return os.path.join(self.folder, key[:2], key)
+
+    @staticmethod
+    def public_name(key, filename):
+        """Name used in URLs: the key plus the original extension (for the MIME type)."""
+        return key + os.path.splitext(filename or "")[1].lower()
+
+    @staticmethod
+    def key_from_name(name):
+        """Blob key of a public name, or None for a legacy plain filename."""
+        match = _BLOB_NAME.match(name or "")
+        return match.group(1) if match else None
+
+    # ---------------------- Adding ----------------------
+    def put_stream(self, stream):
+        """Copy `stream` into the store, hashing as it goes; returns (key, size)."""
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_folder)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    data = stream.read(READ_SIZE)
+                    if not data:
+                        break
+                    f.write(data)
+                    sha.update(data)
+                    size += len(data)
+            key = sha.hexdigest()
+            self.add_file(tmp_path, key, size)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return key, size
+
+    def add_file(self, src_path, key, size=None):
+        """
+        Take a reference on blob `key`, moving `src_path` (whose SHA-256 the
+        caller already computed) into place, or dropping it if the content is
+        already stored.
+        """
+        size = os.path.getsize(src_path) if size is None else size
+        dest = self.path(key)
+        with self.lock():
+            if os.path.exists(dest):
+                os.remove(src_path)
+            else:
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                os.chmod(src_path, 0o644)
+                try:
+                    os.replace(src_path, dest)
+                except OSError:
+                    # different filesystem: copy, then drop the source
+                    shutil.copyfile(src_path, dest)
+                    os.remove(src_path)
+
+            bumped = db.session.execute(
+                update(Blob).where(Blob.key == key).values(refcount=Blob.refcount + 1)
+            )
+            if not bumped.rowcount:
+                db.session.add(Blob(key=key, size=size, refcount=1))
+            db.session.commit()
+        return key
+
+    # ---------------------- Releasing ----------------------
+    def release(self, key):
+        """Drop one reference; unlink the file when none are left. True if unlinked."""
+        with self.lock():
+            blob = db.session.get(Blob, key)
+            if blob is None:
+                return False
+            blob.refcount -= 1
+            if blob.refcount > 0:
+                db.session.commit()
+                return False
+            db.session.delete(blob)
+            db.session.commit()
+            try:
+                os.remove(self.path(key))
+            except FileNotFoundError:
+                pass
+            return True
+
+
+blob_store = BlobStore(Config.BLOB_FOLDER)
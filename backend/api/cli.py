@@ -0,0 +1,78 @@
+import click
+from flask.cli import with_appcontext
+
+from .db import USERS_FILE
+from .journal import MessageJournal
+from .models import db, User, Tutor, Student, TutoringSession, Message, Review
+from .ratings import rebuild_ratings
+from .search import rebuild_search_index
+from .sqlstore import SqlStore
+from .store import JsonStore
+from .routes.message import MESSAGES_FILE, MESSAGES_LOG
+from .routes.sessions import SESSIONS_FILE
+from .routes.student import DATA_FILE as STUDENTS_FILE
+from .routes.tutors import TUTORS_FILE, REVIEWS_FILE, flatten_reviews, reviews_store
+
+
+def import_records(model, records, batch_size):
+    """Insert `records` in batches, skipping ids that are already in the table."""
+    imported = skipped = 0
+    seen = set()
+    for start in range(0, len(records), batch_size):
+        batch = []
+        for record in records[start:start + batch_size]:
+            record_id = record.get("id") if isinstance(record, dict) else None
+            if record_id is None or str(record_id) in seen:
+                skipped += 1
+                continue
+            seen.add(str(record_id))
+            batch.append(record)
+
+        ids = [str(r["id"]) for r in batch]
+        existing = {row_id for (row_id,) in db.session.query(model.id).filter(model.id.in_(ids))}
+        rows = [model().update_from(r) for r in batch if str(r["id"]) not in existing]
+        skipped += len(batch) - len(rows)
+
+        db.session.add_all(rows)
+        db.session.commit()
+        imported += len(rows)
+
+    if imported:
+        SqlStore(model).bump_version()
+        db.session.commit()
+    return imported, skipped
+
+
+@click.command("import-json")
+@click.option("--batch-size", default=500, show_default=True, help="Rows per transaction.")
+@with_appcontext
+def import_json_command(batch_size):
+    """Copy the JSON data files into their SQL tables (safe to re-run)."""
+    sources = [
+        ("users", User, JsonStore(USERS_FILE).all()),
+        ("tutors", Tutor, JsonStore(TUTORS_FILE).all()),
+        ("students", Student, JsonStore(STUDENTS_FILE).all()),
+        ("sessions", TutoringSession, JsonStore(SESSIONS_FILE).all()),
+        ("messages", Message, MessageJournal(MESSAGES_LOG, key="tutor_id", legacy_path=MESSAGES_FILE).all()),
+        ("reviews", Review, JsonStore(REVIEWS_FILE, normalize=flatten_reviews).all()),
+    ]
+    for name, model, records in sources:
+        imported, skipped = import_records(model, records, batch_size)
+        click.echo(f"{name}: {imported} imported, {skipped} skipped")
+
+
+@click.command("reindex-search")
+@with_appcontext
+def reindex_search_command():
+    """Rebuild the full-text index of tutorial videos and papers."""
+    rebuild_search_index()
+    click.echo("search index rebuilt")
+
+
+@click.command("rebuild-ratings")
+@with_appcontext
+def rebuild_ratings_command():
+    """Recompute every tutor's review aggregates from the stored reviews."""
+    with reviews_store.write_lock():
+        rated = rebuild_ratings(reviews_store.iter_all())
+    click.echo(f"ratings rebuilt for {rated} tutors")
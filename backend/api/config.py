@@ -5,6 +5,110 @@ class Config:
     UPLOAD_FOLDER = os.path.join(BASE_DIR, "uploads")
     VIDEO_FOLDER = os.path.join(UPLOAD_FOLDER, "videos")
     PAPER_FOLDER = os.path.join(UPLOAD_FOLDER, "papers")
+    PARTIAL_FOLDER = os.path.join(UPLOAD_FOLDER, "partial")
+    # Content-addressed store for new uploads (see blobs.py)
+    BLOB_FOLDER = os.path.join(UPLOAD_FOLDER, "blobs")
+
+    # Chunked uploads: suggested chunk size, largest file accepted, and how
+    # long an upload may sit untouched before its partial file is removed
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+    UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024
+    UPLOAD_EXPIRY_HOURS = 24
+
+    # Video transcoding: parallel ffmpeg jobs, HLS renditions as (height,
+    # video kbps), audio bitrate, segment length, how often the queue is
+    # checked, when a job still "processing" is presumed dead (seconds), and
+    # how long ffmpeg may run on one video before it is killed and the job
+    # marked failed: the probe and poster frame, then the HLS encode (keep
+    # the encode limit below TRANSCODE_TIMEOUT)
+    HLS_FOLDER = os.path.join(UPLOAD_FOLDER, "hls")
+    TRANSCODE_WORKERS = int(os.getenv("TRANSCODE_WORKERS", 1))
+    TRANSCODE_RENDITIONS = [(240, 400), (480, 1000), (720, 2500)]
+    TRANSCODE_AUDIO_KBPS = 96
+    HLS_SEGMENT_SECONDS = 6
+    TRANSCODE_INTERVAL = 30
+    TRANSCODE_TIMEOUT = 3 * 3600
+    TRANSCODE_PROBE_TIMEOUT = int(os.getenv("TRANSCODE_PROBE_TIMEOUT", 120))
+    TRANSCODE_ENCODE_TIMEOUT = int(os.getenv("TRANSCODE_ENCODE_TIMEOUT", 2 * 3600))
+
+    # Avatar/profile photo variants: square sizes (px) served from
+    # /api/students/avatars/<size>/<file>, encoder quality, and browser cache
+    # lifetime (file names are unique, so variants never change)
+    AVATAR_SIZES = (48, 100, 200, 400)
+    AVATAR_QUALITY = 82
+    AVATAR_CACHE_SECONDS = 365 * 24 * 3600
+
+    # Tutor search: lower bounds of the price bands counted in the facets
+    # (the last band is open-ended), and the page size when none is given
+    TUTOR_PRICE_BANDS = (0, 2000, 5000, 10000, 20000)
+    TUTOR_SEARCH_LIMIT = 20
+
+    # How uploaded files are delivered: "" streams them from the app (sendfile
+    # under gunicorn), "x-accel" hands them to nginx via X-Accel-Redirect to
+    # SENDFILE_PREFIX/<videos|papers>/<file> (an `internal` location aliased
+    # to UPLOAD_FOLDER), "x-sendfile" to Apache/lighttpd via X-Sendfile
+    SENDFILE_MODE = os.getenv("SENDFILE_MODE", "")
+    SENDFILE_PREFIX = os.getenv("SENDFILE_PREFIX", "/protected-uploads")
 
     SQLALCHEMY_DATABASE_URI = "sqlite:///database.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # "json" keeps users/tutors/sessions/... in the *.json files; switch to
+    # "sql" after running `flask --app api.main import-json`
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+
+    # fsync JSON data files (and their directory) on every write
+    FSYNC_WRITES = os.getenv("FSYNC_WRITES") == "True"
+
+    # bcrypt cost for new hashes; older hashes are upgraded on login
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    # Hashing pool: worker threads, extra jobs allowed to queue, and how long
+    # (seconds) a request waits for a slot before getting a 503
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 16))
+    PASSWORD_HASH_WAIT = 2
+
+    # Login tokens: lifetime, and the per-worker cache in front of the
+    # auth_token table (entries are re-checked against the DB after TTL)
+    AUTH_TOKEN_HOURS = int(os.getenv("AUTH_TOKEN_HOURS", 24 * 7))
+    TOKEN_CACHE_SIZE = 10000
+    TOKEN_CACHE_TTL = 60
+    TOKEN_SWEEP_INTERVAL = 600
+    RESET_TOKEN_MINUTES = 60
+
+    # Outbound mail queue: messages sent per batch over one SMTP connection,
+    # seconds before an idle connection is closed, retry limit and the base
+    # backoff (seconds, doubled per attempt), and the socket timeout
+    MAIL_BATCH_SIZE = 20
+    MAIL_IDLE_TIMEOUT = 30
+    MAIL_MAX_RETRIES = 5
+    MAIL_RETRY_BACKOFF = 1
+    MAIL_TIMEOUT = 15
+
+    # Flutterwave client: timeouts (seconds), retries per call and their base
+    # backoff, keep-alive pool size, and the circuit breaker (consecutive
+    # failures before failing fast, seconds before trying the gateway again)
+    FLUTTERWAVE_CONNECT_TIMEOUT = 3.05
+    FLUTTERWAVE_READ_TIMEOUT = 10
+    FLUTTERWAVE_RETRIES = 2
+    FLUTTERWAVE_RETRY_BACKOFF = 0.5
+    FLUTTERWAVE_POOL_SIZE = 10
+    FLUTTERWAVE_BREAKER_THRESHOLD = 5
+    FLUTTERWAVE_BREAKER_RESET = 30
+
+    # Payment reconciler: seconds between runs (also the minimum gap between
+    # two checks of one transaction), transactions per run, parallel verifies,
+    # and the age (hours) after which a still-pending checkout is marked
+    # abandoned and no longer verified (a late webhook can still settle it)
+    PAYMENT_RECONCILE_INTERVAL = 60
+    PAYMENT_RECONCILE_BATCH = 50
+    PAYMENT_RECONCILE_WORKERS = 4
+    PAYMENT_PENDING_MAX_HOURS = int(os.getenv("PAYMENT_PENDING_MAX_HOURS", 24))
+
+    # Length of a booking when the client doesn't send duration_minutes
+    SESSION_DEFAULT_MINUTES = 60
+
+    # Message journal: how often to check for compaction, and the minimum
+    # number of dead log lines before it is worth rewriting the file
+    MESSAGE_COMPACT_INTERVAL = 300
+    MESSAGE_COMPACT_MIN_DEAD = 1000
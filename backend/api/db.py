@@ -1,20 +1,23 @@
 import json
 import os
 
+from .fileio import atomic_write_json
+from .models import User
+from .store import open_store
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 os.makedirs(DATA_DIR, exist_ok=True)
 
 USERS_FILE = os.path.join(DATA_DIR, "users.json")
 
+# Parsed once and indexed; re-read only when the file changes on disk
+users_store = open_store(USERS_FILE, User, indexes=("id", "email"), indent=2)
+
 def load_users():
-    if not os.path.exists(USERS_FILE) or os.stat(USERS_FILE).st_size == 0:
-        return []  # Return empty list if file doesn't exist or is empty
-    with open(USERS_FILE, "r") as f:
-        return json.load(f)
+    return users_store.all()
 
 def save_users(users):
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=2)
+    users_store.save(users)
 
 #goals
 def _goal_file(student_id):
@@ -31,6 +34,4 @@ def load_goals(student_id):
         return []
 
 def save_goals(student_id, goals):
-    path = _goal_file(student_id)
-    with open(path, "w") as f:
-        json.dump(goals, f, indent=2)
\ No newline at end of file
+    atomic_write_json(_goal_file(student_id), goals, indent=2)
\ No newline at end of file
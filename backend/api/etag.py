@@ -0,0 +1,29 @@
+import hashlib
+from functools import wraps
+
+from flask import Response, make_response, request
+
+
+def conditional(version):
+    """
+    Strong ETag for a GET view, derived from `version()` (the versions of the
+    datasets the view reads) and the request path + query. A matching
+    If-None-Match gets an empty 304 without running the view at all.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            raw = f"{version()!r}|{request.full_path}".encode("utf-8")
+            etag = hashlib.sha1(raw).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"  # always revalidate
+            return response
+        return wrapper
+    return decorator
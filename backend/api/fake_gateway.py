@@ -0,0 +1,85 @@
+"""
+Stand-in for the Flutterwave v3 endpoints the backend uses, for local runs
+and tests. Start it with
+
+    flask --app api.fake_gateway run --port 5005
+
+and point the backend at it with FLUTTERWAVE_BASE_URL=http://127.0.0.1:5005.
+
+Faults can be injected with POST /_control, e.g. {"fail": 3} answers the
+next three calls with 503, {"delay": 5} sleeps before every answer, and
+{"settle": "TX-..."} marks a transaction successful.
+"""
+import threading
+import time
+
+from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+
+_lock = threading.Lock()
+_state = {"fail": 0, "delay": 0, "calls": 0}
+_transactions = {}  # tx_ref -> transaction data
+
+
+def _fault():
+    """Apply injected delay/failures; returns an error response or None."""
+    with _lock:
+        _state["calls"] += 1
+        delay = _state["delay"]
+        failing = _state["fail"] > 0
+        if failing:
+            _state["fail"] -= 1
+    if delay:
+        time.sleep(delay)
+    if failing:
+        return jsonify({"status": "error", "message": "Service unavailable"}), 503
+    return None
+
+
+@app.route("/payments", methods=["POST"])
+def payments():
+    error = _fault()
+    if error:
+        return error
+    data = request.get_json() or {}
+    tx_ref = data.get("tx_ref")
+    if not tx_ref:
+        return jsonify({"status": "error", "message": "tx_ref is required"}), 400
+    with _lock:
+        # same tx_ref, same transaction: a retried create must not make a second one
+        tx = _transactions.setdefault(tx_ref, {
+            "id": len(_transactions) + 1,
+            "tx_ref": tx_ref,
+            "amount": data.get("amount"),
+            "currency": data.get("currency"),
+            "status": "pending",
+        })
+    return jsonify({
+        "status": "success",
+        "message": "Hosted Link",
+        "data": {"id": tx["id"], "link": f"{request.host_url}pay/{tx_ref}"},
+    })
+
+
+@app.route("/transactions/verify_by_reference", methods=["GET"])
+def verify_by_reference():
+    error = _fault()
+    if error:
+        return error
+    tx = _transactions.get(request.args.get("tx_ref"))
+    if tx is None:
+        return jsonify({"status": "error", "message": "No transaction was found for this id", "data": None}), 400
+    return jsonify({"status": "success", "message": "Transaction fetched successfully", "data": tx})
+
+
+@app.route("/_control", methods=["GET", "POST"])
+def control():
+    data = request.get_json(silent=True) or {}
+    with _lock:
+        for key in ("fail", "delay"):
+            if key in data:
+                _state[key] = data[key]
+        if data.get("settle") in _transactions:
+            _transactions[data["settle"]]["status"] = data.get("status", "successful")
+        return jsonify({**_state, "transactions": len(_transactions)})
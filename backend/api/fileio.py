@@ -0,0 +1,76 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from .config import Config
+
+
+class FileLock:
+    """
+    Exclusive lock on `path` + ".lock", held across threads and worker
+    processes (flock). Re-entrant within the thread that holds it.
+    """
+
+    def __init__(self, path):
+        self.lock_path = path + ".lock"
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def __call__(self):
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._depth = 1
+                try:
+                    yield
+                finally:
+                    self._depth = 0
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _fsync_dir(path):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, write, fsync=None):
+    """
+    Write a file via a temp file in the same directory and os.replace(), so
+    readers see either the old or the new contents, never a truncated file.
+    `write` is called with the open temp file.
+    """
+    fsync = Config.FSYNC_WRITES if fsync is None else fsync
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+        with os.fdopen(fd, "w") as f:
+            write(f)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if fsync:
+        _fsync_dir(path)
+
+
+def atomic_write_json(path, data, indent=4, fsync=None):
+    atomic_write(path, lambda f: json.dump(data, f, indent=indent), fsync=fsync)
@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import Config
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GatewayError(Exception):
+    """Flutterwave answered, but not with something we can use."""
+
+
+class GatewayUnavailable(GatewayError):
+    """Flutterwave is unreachable or failing; the caller should retry later."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets a single probe through (half-open):
+    success closes it again, failure re-opens it.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        """Seconds until a call will be let through, or 0 if one may go now."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._probing:
+                return max(remaining, 1)
+            self._probing = True
+            return 0
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class FlutterwaveClient:
+    """
+    Flutterwave v3 API over one pooled keep-alive session. Every call has
+    connect/read timeouts; connection errors, timeouts, 429 and 5xx are
+    retried with jittered backoff, and a circuit breaker fails fast while the
+    gateway keeps failing.
+
+    Retrying a payment creation is safe because the payload keeps its tx_ref
+    (also sent as the idempotency key), so the gateway sees one transaction.
+    """
+
+    def __init__(self, secret_key, base_url, timeout=None, retries=None, pool_size=None, breaker=None):
+        self.secret_key = secret_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout or (Config.FLUTTERWAVE_CONNECT_TIMEOUT, Config.FLUTTERWAVE_READ_TIMEOUT)
+        self.retries = Config.FLUTTERWAVE_RETRIES if retries is None else retries
+        self.breaker = breaker or CircuitBreaker(Config.FLUTTERWAVE_BREAKER_THRESHOLD,
+                                                 Config.FLUTTERWAVE_BREAKER_RESET)
+
+        pool_size = pool_size or Config.FLUTTERWAVE_POOL_SIZE
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {secret_key}"})
+
+    # ---------------------- Transport ----------------------
+    def _request(self, method, path, idempotency_key=None, **kwargs):
+        headers = {"X-Idempotency-Key": idempotency_key} if idempotency_key else None
+        url = f"{self.base_url}{path}"
+
+        for attempt in range(self.retries + 1):
+            wait = self.breaker.retry_after()
+            if wait:
+                raise GatewayUnavailable("Payment gateway unavailable", retry_after=int(wait))
+
+            try:
+                r = self.session.request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            else:
+                if r.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    try:
+                        return r.json()
+                    except ValueError:
+                        raise GatewayError(f"Invalid response from gateway (HTTP {r.status_code})")
+                error = f"HTTP {r.status_code}"
+
+            self.breaker.record_failure()
+            print(f"Flutterwave {method} {path} failed (attempt {attempt + 1}):", error)
+            if attempt < self.retries:
+                time.sleep(Config.FLUTTERWAVE_RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5))
+
+        raise GatewayUnavailable("Payment gateway unavailable", retry_after=self.breaker.reset_timeout)
+
+    # ---------------------- API ----------------------
+    def create_payment(self, payload):
+        """POST /payments (Flutterwave Standard); returns the decoded response."""
+        return self._request("POST", "/payments", idempotency_key=payload["tx_ref"], json=payload)
+
+    def verify_by_reference(self, tx_ref):
+        return self._request("GET", "/transactions/verify_by_reference", params={"tx_ref": tx_ref})
@@ -0,0 +1,77 @@
+import os
+import tempfile
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .config import Config
+
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpg": ("JPEG", "image/jpeg")}
+
+
+class ImageVariants:
+    """
+    Square, resized copies of uploaded images in Config.AVATAR_SIZES, as WebP
+    and JPEG, cached under <folder>/variants/<size>/<name>.<ext>. Made at
+    upload time, or on first request for images uploaded before this existed.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.variant_folder = os.path.join(folder, "variants")
+
+    def path(self, size, filename, ext):
+        stem = os.path.splitext(filename)[0]
+        return os.path.join(self.variant_folder, str(size), f"{stem}.{ext}")
+
+    def _render(self, image, size, ext, dest):
+        fmt = FORMATS[ext][0]
+        variant = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        if fmt == "JPEG" and variant.mode != "RGB":
+            variant = variant.convert("RGB")
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                variant.save(f, fmt, quality=Config.AVATAR_QUALITY, optimize=fmt == "JPEG")
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, dest)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _open(self, filename):
+        with Image.open(os.path.join(self.folder, filename)) as original:
+            original.draft("RGB", (max(Config.AVATAR_SIZES),) * 2)  # JPEG: decode at reduced scale
+            image = ImageOps.exif_transpose(original)
+            image.load()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        return image
+
+    def generate(self, filename, sizes=None, exts=None):
+        """Write the variants of `filename`; False if it isn't a readable image."""
+        try:
+            image = self._open(filename)
+            for size in sizes or Config.AVATAR_SIZES:
+                for ext in exts or FORMATS:
+                    self._render(image, size, ext, self.path(size, filename, ext))
+        except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+            print(f"Could not make image variants of {filename}:", e)
+            return False
+        return True
+
+    def get(self, size, filename, ext):
+        """Path of a variant, rendering it first if needed; None if there is no such image."""
+        if size not in Config.AVATAR_SIZES or ext not in FORMATS:
+            return None
+        if os.path.basename(filename) != filename or filename.startswith("."):
+            return None
+        path = self.path(size, filename, ext)
+        if os.path.exists(path):
+            return path
+        if not os.path.isfile(os.path.join(self.folder, filename)):
+            return None
+        if not self.generate(filename, sizes=[size], exts=[ext]):
+            return None
+        return path
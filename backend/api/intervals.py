@@ -0,0 +1,59 @@
+import bisect
+
+
+class IntervalIndex:
+    """
+    Half-open [start, end) intervals grouped by key (e.g. tutor id), each group
+    kept sorted by start. Any interval overlapping [s, e) must start after
+    s - longest interval, so overlap and free-slot queries are a bisect plus
+    a walk over the neighbours that actually matter.
+    """
+
+    def __init__(self):
+        self._intervals = {}  # key -> sorted [(start, end, item_id)]
+        self._longest = {}    # key -> longest (end - start) ever added
+
+    def add(self, key, start, end, item_id):
+        bisect.insort(self._intervals.setdefault(key, []), (start, end, item_id))
+        longest = self._longest.get(key)
+        if longest is None or end - start > longest:
+            self._longest[key] = end - start
+
+    def remove(self, key, start, item_id):
+        intervals = self._intervals.get(key, [])
+        i = bisect.bisect_left(intervals, (start,))
+        while i < len(intervals) and intervals[i][0] == start:
+            if intervals[i][2] == item_id:
+                del intervals[i]
+                return True
+            i += 1
+        return False
+
+    def _candidates(self, key, start):
+        """Intervals that could end after `start`, in start order."""
+        intervals = self._intervals.get(key)
+        if not intervals:
+            return
+        lowest = start - self._longest[key]
+        for i in range(bisect.bisect_left(intervals, (lowest,)), len(intervals)):
+            yield intervals[i]
+
+    def overlapping(self, key, start, end):
+        """Ids of intervals for `key` that overlap [start, end)."""
+        found = []
+        for s, e, item_id in self._candidates(key, start):
+            if s >= end:
+                break
+            if e > start:
+                found.append(item_id)
+        return found
+
+    def next_free(self, key, after, duration):
+        """Earliest start >= `after` with `duration` free for `key`."""
+        candidate = after
+        for s, e, _ in self._candidates(key, after):
+            if s >= candidate + duration:
+                break
+            if e > candidate:
+                candidate = e
+        return candidate
@@ -0,0 +1,202 @@
+import json
+import os
+import threading
+
+from .config import Config
+from .fileio import FileLock, atomic_write
+
+
+class MessageJournal:
+    """
+    Append-only JSON-lines log of records with an in-memory index per key.
+
+    Every write is a single appended line: ``put`` for a new record, ``edit``
+    and ``delete`` tombstones for changes. Readers only parse the bytes added
+    since their last look, so cost per request does not grow with history.
+    `compact()` rewrites the log with just the live records.
+
+    Offers the JsonStore interface, with lookups limited to ``id`` and `key`.
+    """
+
+    def __init__(self, path, key, legacy_path=None):
+        self.path = path
+        self.key = key
+        self.legacy_path = legacy_path
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path)
+        self._inode = None
+        self._offset = 0
+        self._lines = 0
+        self._by_id = {}
+        self._by_key = {}
+        # here rather than on first read, so the file lock is never taken
+        # while holding self._lock (writers take them in the other order)
+        with self._file_lock():
+            self._import_legacy()
+
+    # ---------------------- Internals ----------------------
+    def _reset(self):
+        self._inode = None
+        self._offset = 0
+        self._lines = 0
+        self._by_id = {}
+        self._by_key = {}
+
+    def _index(self, record):
+        self._by_id[record["id"]] = record
+        self._by_key.setdefault(record.get(self.key), {})[record["id"]] = record
+
+    def _unindex(self, record):
+        self._by_id.pop(record["id"], None)
+        bucket = self._by_key.get(record.get(self.key))
+        if bucket is not None:
+            bucket.pop(record["id"], None)
+            if not bucket:
+                del self._by_key[record.get(self.key)]
+
+    def _apply(self, entry):
+        op = entry.get("op")
+        if op == "put":
+            record = entry["record"]
+            old = self._by_id.get(record["id"])
+            if old is not None:
+                self._unindex(old)
+            self._index(record)
+        elif op == "edit":
+            old = self._by_id.get(entry["id"])
+            if old is not None:
+                self._unindex(old)
+                self._index({**old, **entry["changes"]})
+        elif op == "delete":
+            old = self._by_id.get(entry["id"])
+            if old is not None:
+                self._unindex(old)
+
+    def _import_legacy(self):
+        """Seed the log from the old whole-file JSON array, once."""
+        if not self.legacy_path or os.path.exists(self.path):
+            return
+        try:
+            with open(self.legacy_path, "r") as f:
+                data = f.read().strip()
+            records = json.loads(data) if data else []
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if records:
+            self.save(records)
+
+    def _refresh(self):
+        """Apply whatever other writers appended since the last read."""
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                return
+            if st.st_ino != self._inode or st.st_size < self._offset:
+                self._reset()  # compacted or replaced underneath us
+                self._inode = st.st_ino
+            if st.st_size == self._offset:
+                return
+
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(st.st_size - self._offset)
+            end = chunk.rfind(b"\n") + 1  # leave a half-written last line for next time
+            for line in chunk[:end].splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                self._lines += 1
+            self._offset += end
+
+    def _append(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._file_lock(), self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+                if Config.FSYNC_WRITES:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._refresh()
+
+    def _lookup(self, field, value):
+        if field == "id":
+            record = self._by_id.get(value)
+            return [record] if record is not None else []
+        if field == self.key:
+            return list(self._by_key.get(value, {}).values())
+        raise KeyError(field)
+
+    # ---------------------- Public API ----------------------
+    @property
+    def version(self):
+        self._refresh()
+        return (self._inode, self._offset)
+
+    @property
+    def dead_entries(self):
+        """Log lines that no longer describe a live record."""
+        self._refresh()
+        return self._lines - len(self._by_id)
+
+    def all(self):
+        with self._lock:
+            self._refresh()
+            return list(self._by_id.values())
+
+    def iter_all(self):
+        return iter(self.all())
+
+    def get(self, field, value):
+        with self._lock:
+            self._refresh()
+            matches = self._lookup(field, value)
+        return matches[0] if matches else None
+
+    def filter(self, field, value):
+        with self._lock:
+            self._refresh()
+            return self._lookup(field, value)
+
+    def insert(self, record):
+        self._append({"op": "put", "record": record})
+        return record
+
+    def update(self, field, value, changes):
+        """Append an ``edit`` tombstone for the first matching record."""
+        record = self.get(field, value)
+        if record is None:
+            return None
+        self._append({"op": "edit", "id": record["id"], "changes": changes})
+        return self.get("id", record["id"])
+
+    def delete(self, field, value):
+        """Append a ``delete`` tombstone for every matching record."""
+        records = self.filter(field, value)
+        for record in records:
+            self._append({"op": "delete", "id": record["id"]})
+        return bool(records)
+
+    def save(self, records):
+        """Replace the whole log with `records` (one ``put`` line each)."""
+        def write(f):
+            for record in records:
+                f.write(json.dumps({"op": "put", "record": record}, separators=(",", ":")) + "\n")
+
+        with self._file_lock(), self._lock:
+            atomic_write(self.path, write)
+            self._reset()
+            self._refresh()
+
+    def compact(self, min_dead=1000):
+        """Drop tombstones and superseded lines once they outnumber live records."""
+        dead = self.dead_entries
+        if dead < min_dead or dead < len(self._by_id):
+            return False
+        with self._file_lock():
+            self.save(self.all())
+        return True
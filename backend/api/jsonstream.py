@@ -0,0 +1,29 @@
+from flask import Response, current_app, stream_with_context
+
+CHUNK_SIZE = 64 * 1024
+
+
+def stream_json(items, key=None):
+    """
+    Stream a JSON array (or ``{key: [...]}``) while `items` is being iterated,
+    so memory stays bounded by one chunk and the first byte goes out at once.
+    Items are serialized with the app's JSON provider, same as jsonify.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        buffer = [f'{{"{key}":[' if key else "["]
+        size = 0
+        first = True
+        for item in items:
+            text = dumps(item) if first else "," + dumps(item)
+            first = False
+            buffer.append(text)
+            size += len(text)
+            if size >= CHUNK_SIZE:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        buffer.append("]}" if key else "]")
+        yield "".join(buffer)
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
@@ -0,0 +1,143 @@
+import queue
+import smtplib
+import threading
+import time
+
+from flask import current_app
+
+from .config import Config
+
+
+class MailQueue:
+    """
+    Sends Flask-Mail messages from a background thread so request handlers
+    never wait on SMTP.
+
+    Messages are rendered when queued (that needs the app context) and the
+    worker only talks SMTP: it keeps one connection open between messages,
+    sends whatever has queued up as a batch over it, reconnects and retries
+    with exponential backoff on connection errors, and closes the connection
+    after MAIL_IDLE_TIMEOUT seconds without mail. Server settings come from
+    the app's Flask-Mail config (MAIL_SERVER, MAIL_PORT, ...).
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._settings = None
+        self._conn = None
+
+    # ---------------------- Producer side ----------------------
+    def send(self, msg):
+        """Render `msg` and queue it; returns immediately."""
+        if self._settings is None:
+            self._settings = self._read_settings(current_app.extensions["mail"])
+        self._queue.put((msg.sender, list(msg.send_to), msg.as_bytes(), 0))
+        self._ensure_worker()
+
+    def flush(self):
+        """Block until everything queued so far was sent or given up on."""
+        self._queue.join()
+
+    @staticmethod
+    def _read_settings(state):
+        return {
+            "server": state.server,
+            "port": state.port,
+            "use_tls": state.use_tls,
+            "use_ssl": state.use_ssl,
+            "username": state.username,
+            "password": state.password,
+        }
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+                self._thread.start()
+
+    # ---------------------- SMTP connection ----------------------
+    def _connect(self):
+        s = self._settings
+        smtp_class = smtplib.SMTP_SSL if s["use_ssl"] else smtplib.SMTP
+        conn = smtp_class(s["server"], s["port"], timeout=Config.MAIL_TIMEOUT)
+        if s["use_tls"]:
+            conn.starttls()
+        if s["username"] and s["password"]:
+            conn.login(s["username"], s["password"])
+        return conn
+
+    def _close(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.quit()
+        except (smtplib.SMTPException, OSError):
+            self._conn.close()
+        self._conn = None
+
+    # ---------------------- Worker ----------------------
+    def _next_batch(self):
+        """Wait for mail (closing an idle connection meanwhile), then drain up to a batch."""
+        try:
+            batch = [self._queue.get(timeout=Config.MAIL_IDLE_TIMEOUT)]
+        except queue.Empty:
+            self._close()
+            batch = [self._queue.get()]
+        while len(batch) < Config.MAIL_BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send_batch(self, batch):
+        """Send over the shared connection; returns the messages to retry."""
+        failed = []
+        for i, item in enumerate(batch):
+            sender, recipients, body, attempts = item
+            try:
+                if self._conn is None:
+                    self._conn = self._connect()
+                self._conn.sendmail(sender, recipients, body)
+            except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                # the server rejected this message; resending won't help
+                print(f"Email to {recipients} rejected:", e)
+            except (smtplib.SMTPException, OSError) as e:
+                # connection trouble: everything not yet sent goes round again
+                print("Email sending failed:", e)
+                self._close()
+                failed = [(s, r, b, a + 1) for s, r, b, a in batch[i:]]
+                break
+        return failed
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                failed = self._send_batch(batch)
+            except Exception as e:
+                print("Mail queue error:", e)
+                self._close()
+                failed = []
+
+            retry = []
+            for item in failed:
+                if item[3] > Config.MAIL_MAX_RETRIES:
+                    print(f"Giving up on email to {item[1]} after {item[3]} attempts")
+                else:
+                    retry.append(item)
+            if retry:
+                attempts = max(item[3] for item in retry)
+                time.sleep(min(Config.MAIL_RETRY_BACKOFF * 2 ** (attempts - 1), 60))
+                for item in retry:
+                    self._queue.put(item)
+
+            for _ in batch:
+                self._queue.task_done()
+
+
+mail_queue = MailQueue()
@@ -3,20 +3,25 @@ from flask_cors import CORS
 from flask_socketio import SocketIO
 from .routes.video import video_bp, init_socketio
 from .config import Config
-from .models import db  # SQLAlchemy instance
+from .cli import import_json_command, rebuild_ratings_command, reindex_search_command
+from .models import db, ensure_schema  # SQLAlchemy instance
+from .search import ensure_search_index
+from .transcode import transcoder
+from .tokens import start_token_sweeper
 from flask_mail import Mail
 from dotenv import load_dotenv
 import os
 
 from .routes.auth import auth_bp
 from .routes.student import students_bp
-from .routes.tutors import tutors_bp
-from .routes.sessions import sessions_bp
-from .routes.message import messages_bp
+from .routes.tutors import tutors_bp, ensure_rating_aggregates, start_upload_cleanup
+from .routes.sessions import sessions_bp, init_session_events
+from .routes.message import messages_bp, start_message_compaction
 from .routes.video import video_bp
-from .routes.payments import payments_bp
+from .routes.payments import payments_bp, init_payment_events, start_payment_reconciler
 from .routes.referral import referral_bp
-from .routes.reset import reset_bp
+from .routes.reset import reset_bp, start_reset_token_purge
+from .routes.search import search_bp
 
 # --- CREATE FLASK APP ---
 app = Flask(__name__)
@@ -35,11 +40,22 @@ mail = Mail(app)
 db.init_app(app) 
 with app.app_context():
     db.create_all()
+    ensure_schema()
+    ensure_search_index()
+    ensure_rating_aggregates()
  # ✅ fixes 'current Flask app is not registered with this SQLAlchemy instance'
 
+app.cli.add_command(import_json_command)
+app.cli.add_command(reindex_search_command)
+app.cli.add_command(rebuild_ratings_command)
+
 # --- SOCKET.IO ---
-socketio = SocketIO(app, cors_allowed_origins="*")
+# With several workers, set SOCKETIO_MESSAGE_QUEUE (e.g. redis://...) so
+# session pushes reach clients connected to any worker
+socketio = SocketIO(app, cors_allowed_origins="*", message_queue=os.getenv("SOCKETIO_MESSAGE_QUEUE"))
 init_socketio(socketio)
+init_session_events(socketio)
+init_payment_events(socketio)
 
 # --- CONFIG ---
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # max 500MB
@@ -62,6 +78,15 @@ app.register_blueprint(video_bp, url_prefix="/api/video")
 app.register_blueprint(payments_bp, url_prefix="/api/payments")
 app.register_blueprint(referral_bp, url_prefix="/api/referral")
 app.register_blueprint(reset_bp, url_prefix="/api/reset")
+app.register_blueprint(search_bp, url_prefix="/api/search")
+
+# --- BACKGROUND JOBS ---
+start_message_compaction()
+start_token_sweeper(app)
+start_reset_token_purge(app)
+start_payment_reconciler(app)
+start_upload_cleanup()
+transcoder.init_app(app)
 
 # --- RUN SERVER ---
 if __name__ == "__main__":
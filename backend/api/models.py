@@ -1,22 +1,301 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from itertools import chain
+from sqlalchemy import event, insert, inspect, text, update
+from sqlalchemy.orm import Session
 
 db = SQLAlchemy()
 
 class TutorVideo(db.Model):
+    VERSIONED = True  # bump dataset_version("tutor_video") on every change
+
     id = db.Column(db.Integer, primary_key=True)
     tutor_id = db.Column(db.String(100), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     uploader = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
+    subject = db.Column(db.String(100))
     url = db.Column(db.String(300))
+    # uploads since the blob store: content key and the name it was uploaded as
+    blob_key = db.Column(db.String(64), index=True)
+    filename = db.Column(db.String(255))
+    # HLS output (paths under HLS_FOLDER) and the transcoding job's state:
+    # pending -> processing -> ready | failed, None for videos never queued
+    duration = db.Column(db.Float)
+    hls = db.Column(db.String(300))
+    poster = db.Column(db.String(300))
+    transcode_status = db.Column(db.String(20), index=True)
+    transcode_error = db.Column(db.String(500))
+    transcode_started_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # keyset pagination of /all/videos walks (created_at, id) newest first
+    __table_args__ = (db.Index("ix_tutor_video_created_id", "created_at", "id"),)
+
 class TutorPaper(db.Model):
+    VERSIONED = True
+
     id = db.Column(db.Integer, primary_key=True)
     tutor_id = db.Column(db.String(100), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     uploader = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
+    subject = db.Column(db.String(100))
     url = db.Column(db.String(300))
+    blob_key = db.Column(db.String(64), index=True)
+    filename = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index("ix_tutor_paper_created_id", "created_at", "id"),)
+
+class Blob(db.Model):
+    """One stored file per distinct SHA-256; refcount = rows pointing at it."""
+    key = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ---------------------- JSON store tables ----------------------
+# Mirror the records kept in the *.json files. FIELDS maps each JSON key to
+# its column; keys without a column are kept in `extra` so nothing is lost.
+
+class RecordMixin:
+    FIELDS = {}
+
+    extra = db.Column(db.JSON, default=dict)
+
+    def to_dict(self):
+        data = dict(self.extra or {})
+        for key, attr in self.FIELDS.items():
+            value = getattr(self, attr)
+            if value is not None:
+                data[key] = value
+        return data
+
+    def update_from(self, record):
+        extra = dict(self.extra or {})
+        for key, value in record.items():
+            attr = self.FIELDS.get(key)
+            if attr:
+                setattr(self, attr, value)
+            else:
+                extra[key] = value
+        self.extra = extra
+        return self
+
+class User(RecordMixin, db.Model):
+    FIELDS = {"id": "id", "fullName": "full_name", "email": "email", "password": "password",
+              "role": "role", "profilePhoto": "profile_photo"}
+
+    id = db.Column(db.String(64), primary_key=True)
+    full_name = db.Column(db.String(200))
+    email = db.Column(db.String(200), index=True)
+    password = db.Column(db.String(200))
+    role = db.Column(db.String(20))
+    profile_photo = db.Column(db.String(300))
+
+class Tutor(RecordMixin, db.Model):
+    FIELDS = {"id": "id", "userId": "user_id", "subjects": "subjects", "experience": "experience",
+              "price": "price", "bio": "bio", "availability": "availability"}
+
+    id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.String(64), index=True)
+    subjects = db.Column(db.JSON)
+    experience = db.Column(db.JSON)  # number or string, as submitted
+    price = db.Column(db.JSON)
+    bio = db.Column(db.Text)
+    availability = db.Column(db.JSON)
+
+class Student(RecordMixin, db.Model):
+    FIELDS = {"id": "id", "name": "name", "email": "email", "institution": "institution",
+              "course": "course", "goals": "goals", "avatar": "avatar"}
+
+    id = db.Column(db.String(64), primary_key=True)
+    name = db.Column(db.String(200))
+    email = db.Column(db.String(200), index=True)
+    institution = db.Column(db.String(200))
+    course = db.Column(db.String(200))
+    goals = db.Column(db.Text)
+    avatar = db.Column(db.String(300))
+
+class TutoringSession(RecordMixin, db.Model):
+    FIELDS = {"id": "id", "student_name": "student_name", "student_email": "student_email",
+              "tutorId": "tutor_id", "tutor_name": "tutor_name", "session_time": "session_time",
+              "topic": "topic", "status": "status", "created_at": "created_at"}
+
+    id = db.Column(db.String(64), primary_key=True)
+    student_name = db.Column(db.String(200))
+    student_email = db.Column(db.String(200), index=True)
+    tutor_id = db.Column(db.String(64), index=True)
+    tutor_name = db.Column(db.String(200))
+    session_time = db.Column(db.String(40), index=True)  # ISO string, as in sessions.json
+    topic = db.Column(db.String(300))
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.String(40))
+
+    __table_args__ = (db.Index("ix_tutoring_session_tutor_time", "tutor_id", "session_time"),)
+
+class Message(RecordMixin, db.Model):
+    FIELDS = {"id": "id", "tutor_id": "tutor_id", "sender": "sender", "message": "message",
+              "timestamp": "timestamp"}
+
+    id = db.Column(db.String(64), primary_key=True)
+    tutor_id = db.Column(db.String(64), index=True)
+    sender = db.Column(db.String(200))
+    message = db.Column(db.Text)
+    timestamp = db.Column(db.String(40))
+
+    __table_args__ = (db.Index("ix_message_tutor_timestamp", "tutor_id", "timestamp"),)
+
+class Review(RecordMixin, db.Model):
+    FIELDS = {"id": "id", "tutorId": "tutor_id", "rating": "rating", "comment": "comment"}
+
+    id = db.Column(db.String(64), primary_key=True)
+    tutor_id = db.Column(db.String(64), index=True)
+    rating = db.Column(db.Float)
+    comment = db.Column(db.Text)
+
+class TutorRating(db.Model):
+    """
+    Running review aggregates per tutor, bumped in place with each review
+    (ratings.py) so listings never rescan reviews. The index on average
+    serves best-rated-first ordering.
+    """
+    tutor_id = db.Column(db.String(64), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0)
+    average = db.Column(db.Float)
+    # histogram: reviews per star, rating rounded to 1..5
+    stars_1 = db.Column(db.Integer, nullable=False, default=0)
+    stars_2 = db.Column(db.Integer, nullable=False, default=0)
+    stars_3 = db.Column(db.Integer, nullable=False, default=0)
+    stars_4 = db.Column(db.Integer, nullable=False, default=0)
+    stars_5 = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.Index("ix_tutor_rating_average_count", "average", "count"),)
+
+    def to_dict(self):
+        return {
+            "rating": round(self.average, 2) if self.count else None,
+            "reviewsCount": self.count,
+            "ratingHistogram": {str(star): getattr(self, f"stars_{star}") for star in range(1, 6)},
+        }
+
+class AuthToken(db.Model):
+    """Login tokens, stored as their SHA-256 (tokens.token_hash); validated through the cache in tokens.py."""
+    token = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.String(64), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class ResetToken(db.Model):
+    """Password reset tokens, shared by every worker; purged once expired."""
+    token = db.Column(db.String(64), primary_key=True)
+    email = db.Column(db.String(120), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class Payment(db.Model):
+    """
+    Ledger entry per Flutterwave transaction. The reconciler moves status
+    from pending to completed/failed, or to abandoned once it is older than
+    PAYMENT_PENDING_MAX_HOURS; last_checked_at orders and claims its batches.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    tx_ref = db.Column(db.String(64), unique=True, nullable=False)
+    flw_id = db.Column(db.String(64))
+    user_id = db.Column(db.String(64), index=True)
+    method = db.Column(db.String(30))
+    amount = db.Column(db.Float)
+    currency = db.Column(db.String(3))
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    gateway_status = db.Column(db.String(30))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_checked_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index("ix_payment_status_checked", "status", "last_checked_at"),)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "tx_ref": self.tx_ref,
+            "flw_id": self.flw_id,
+            "user_id": self.user_id,
+            "method": self.method,
+            "amount": self.amount,
+            "currency": self.currency,
+            "status": self.status,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+class DatasetVersion(db.Model):
+    """Bumped in the same transaction as every write to a dataset table."""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def dataset_version(name):
+    row = db.session.get(DatasetVersion, name)
+    return row.version if row else 0
+
+def bump_dataset_version(connection, name):
+    table = DatasetVersion.__table__
+    bumped = connection.execute(
+        update(table).where(table.c.name == name).values(version=table.c.version + 1)
+    )
+    if not bumped.rowcount:
+        connection.execute(insert(table).values(name=name, version=1))
+
+@event.listens_for(Session, "before_flush")
+def _bump_versioned_tables(session, flush_context, instances):
+    changed = {
+        obj.__tablename__
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if getattr(obj, "VERSIONED", False)
+    }
+    for name in changed:
+        bump_dataset_version(session.connection(), name)
+
+
+def purge_expired(model, batch_size=1000):
+    """
+    Delete rows whose expires_at has passed, `batch_size` at a time so the
+    write lock is never held for long. Returns the number deleted.
+    """
+    key = model.__mapper__.primary_key[0]
+    now = datetime.utcnow()
+    total = 0
+    while True:
+        expired = db.session.query(key).filter(model.expires_at < now).limit(batch_size)
+        deleted = model.query.filter(key.in_(expired.scalar_subquery())).delete(synchronize_session=False)
+        db.session.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def ensure_indexes():
+    """create_all() skips tables that already exist; add any indexes they lack."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+
+def ensure_schema():
+    """
+    Bring tables created by an older version up to date: add the (nullable)
+    columns they lack with ALTER TABLE ADD COLUMN, then any missing indexes.
+    """
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+    ensure_indexes()
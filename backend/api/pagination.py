@@ -0,0 +1,57 @@
+import base64
+import json
+
+from flask import request
+
+MAX_LIMIT = 200
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    """Opaque, URL-safe cursor for the sort key of the last item on a page."""
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+
+
+def page_args():
+    """
+    Read `limit`, `cursor` and `fields` from the query string.
+    limit is None when the client didn't ask for paging (old behaviour).
+    """
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PaginationError("limit must be an integer")
+        if limit < 1:
+            raise PaginationError("limit must be positive")
+        limit = min(limit, MAX_LIMIT)
+    elif cursor:
+        limit = MAX_LIMIT
+
+    fields = request.args.get("fields")
+    fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    cursor = decode_cursor(cursor) if cursor else None
+    if cursor is not None and not isinstance(cursor, list):
+        raise PaginationError("Invalid cursor")  # every cursor we hand out is a list
+    return limit, cursor, fields
+
+
+def project(item, fields):
+    """Keep only the requested keys of a serialized item."""
+    if not fields:
+        return item
+    return {k: item[k] for k in fields if k in item}
@@ -0,0 +1,82 @@
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from .config import Config
+
+
+class HashingBusy(Exception):
+    """Too many hashes queued; the caller should answer 503 and let the client retry."""
+
+
+# bcrypt releases the GIL, so a small thread pool keeps request threads free.
+# The semaphore bounds running + queued jobs so a login burst gets fast 503s
+# instead of an ever-growing queue.
+_pool = ThreadPoolExecutor(max_workers=Config.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots = threading.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE)
+
+
+def _on_eventlet_hub():
+    """
+    True when requests run as green threads on a monkey-patched eventlet hub.
+    eventlet merely being installed (Socket.IO picks it as async_mode) is not
+    enough: under a threaded server requests are still OS threads.
+    """
+    patcher = sys.modules.get("eventlet.patcher")  # never patched if never imported
+    return patcher is not None and patcher.is_monkey_patched("thread")
+
+
+_green_slots = None
+
+
+def _offload(func, *args):
+    if _on_eventlet_hub():
+        # patched threading makes the pool's workers greenlets too, so bcrypt
+        # would run on (and freeze) the hub; wait on a green semaphore and let
+        # tpool run it on a real OS thread while other greenlets carry on
+        global _green_slots
+        from eventlet import semaphore, tpool
+        if _green_slots is None:
+            _green_slots = semaphore.BoundedSemaphore(Config.PASSWORD_HASH_WORKERS + Config.PASSWORD_HASH_QUEUE)
+        if not _green_slots.acquire(timeout=Config.PASSWORD_HASH_WAIT):
+            raise HashingBusy()
+        try:
+            return tpool.execute(func, *args)
+        finally:
+            _green_slots.release()
+
+    if not _slots.acquire(timeout=Config.PASSWORD_HASH_WAIT):
+        raise HashingBusy()
+    try:
+        return _pool.submit(func, *args).result()
+    finally:
+        _slots.release()
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def hash_password(password):
+    return _offload(_hash, password, Config.BCRYPT_ROUNDS)
+
+
+def check_password(password, hashed):
+    try:
+        return _offload(_check, password, hashed)
+    except ValueError:  # not a bcrypt hash
+        return False
+
+
+def needs_rehash(hashed):
+    """True when `hashed` was made with a different cost than BCRYPT_ROUNDS ($2b$12$...)."""
+    try:
+        return int(hashed.split("$")[2]) != Config.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
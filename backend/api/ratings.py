@@ -0,0 +1,79 @@
+from sqlalchemy import update
+
+from .models import db, TutorRating, bump_dataset_version, dataset_version
+
+NO_REVIEWS = {"rating": None, "reviewsCount": 0,
+              "ratingHistogram": {str(star): 0 for star in range(1, 6)}}
+
+
+def star_of(rating):
+    return min(max(int(round(rating)), 1), 5)
+
+
+def ratings_version():
+    return dataset_version(TutorRating.__tablename__)
+
+
+def record_review(tutor_id, rating):
+    """
+    Fold one new review into its tutor's aggregates: a single UPDATE of
+    count, total, average and one histogram bucket (an INSERT for a first
+    review). Staged in the session; the caller commits along with the review.
+    """
+    column = f"stars_{star_of(rating)}"
+    bumped = db.session.execute(
+        update(TutorRating).where(TutorRating.tutor_id == str(tutor_id)).values({
+            "count": TutorRating.count + 1,
+            "total": TutorRating.total + rating,
+            # right-hand sides see the old row, so this is the new mean
+            "average": (TutorRating.total + rating) / (TutorRating.count + 1),
+            column: getattr(TutorRating, column) + 1,
+        })
+    )
+    if not bumped.rowcount:
+        db.session.add(TutorRating(tutor_id=str(tutor_id), count=1, total=rating, average=rating, **{column: 1}))
+    bump_dataset_version(db.session.connection(), TutorRating.__tablename__)
+
+
+def rating_summaries(tutor_ids=None):
+    """tutor id -> {rating, reviewsCount, ratingHistogram}, for `tutor_ids` or every rated tutor."""
+    query = TutorRating.query
+    if tutor_ids is not None:
+        query = query.filter(TutorRating.tutor_id.in_([str(t) for t in tutor_ids]))
+    return {row.tutor_id: row.to_dict() for row in query}
+
+
+def best_rated(batch_size=500):
+    """Ids of rated tutors, best average first (more reviews breaks ties), off the index."""
+    query = (
+        db.session.query(TutorRating.tutor_id)
+        .order_by(TutorRating.average.desc(), TutorRating.count.desc())
+    )
+    return (tutor_id for (tutor_id,) in query.yield_per(batch_size))
+
+
+def rebuild_ratings(reviews):
+    """Recompute every tutor's aggregates from `reviews` (one pass) and commit."""
+    totals = {}
+    for review in reviews:
+        try:
+            rating = float(review["rating"])
+            tutor_id = str(review["tutorId"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        row = totals.get(tutor_id)
+        if row is None:
+            row = totals[tutor_id] = TutorRating(tutor_id=tutor_id, count=0, total=0.0,
+                                                 **{f"stars_{star}": 0 for star in range(1, 6)})
+        row.count += 1
+        row.total += rating
+        column = f"stars_{star_of(rating)}"
+        setattr(row, column, getattr(row, column) + 1)
+    for row in totals.values():
+        row.average = row.total / row.count
+
+    TutorRating.query.delete()
+    db.session.add_all(totals.values())
+    bump_dataset_version(db.session.connection(), TutorRating.__tablename__)
+    db.session.commit()
+    return len(totals)
@@ -1,12 +1,19 @@
-from flask import Blueprint, request, jsonify
-from api.db import load_users, save_users
-from .tutors import load_tutors
+from flask import Blueprint, g, request, jsonify
+from api.db import users_store
+from api.passwords import HashingBusy, check_password, hash_password, needs_rehash
+from api.tokens import bearer_token, issue_token, require_auth, revoke_token
+from .tutors import tutors_store
 
-import bcrypt
 import uuid
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
+
+@auth_bp.errorhandler(HashingBusy)
+def hashing_busy(e):
+    return jsonify({"error": "Server is busy, please try again"}), 503, {"Retry-After": "1"}
+
+
 # ----------------------
 # REGISTER ROUTE
 # ----------------------
@@ -21,13 +28,11 @@ def register():
     if not all([full_name, email, password, role]):
         return jsonify({"error": "All fields are required"}), 400
 
-    users = load_users()
-    if any(u.get("email") == email for u in users):
-
+    if users_store.get("email", email):
         return jsonify({"error": "Email already registered"}), 400
 
     # Hash password
-    hashed_pw = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    hashed_pw = hash_password(password)
 
     # Create new user
     user = {
@@ -38,8 +43,7 @@ def register():
         "role": role
     }
 
-    users.append(user)
-    save_users(users)
+    users_store.insert(user)
 
     # Return user info for frontend (so `user.id` exists)
     return jsonify({
@@ -60,22 +64,24 @@ def login():
     email = data.get("email")
     password = data.get("password")
 
-    users = load_users()
-    user = next((u for u in users if u.get("email") == email), None)
+    user = users_store.get("email", email)
     if not user:
         return jsonify({"error": "User not found"}), 401
 
 
-    if not bcrypt.checkpw(password.encode("utf-8"), user["password"].encode("utf-8")):
+    if not check_password(password, user["password"]):
         return jsonify({"error": "Invalid password"}), 401
 
-    token = str(uuid.uuid4())
+    # Transparently move old hashes to the current BCRYPT_ROUNDS
+    if needs_rehash(user["password"]):
+        users_store.update("id", user["id"], {"password": hash_password(password)})
+
+    token = issue_token(user["id"])
 
     # Load tutor details if this user is a tutor
     tutor_details = None
     if user["role"] == "tutor":
-        tutors = load_tutors()
-        tutor_details = next((t for t in tutors if t.get("userId") == user["id"]), None)
+        tutor_details = tutors_store.get("userId", user["id"])
 
 
     return jsonify({
@@ -88,3 +94,28 @@ def login():
             "tutorDetails": tutor_details  # <--- include tutor details if they exist
         }
     }), 200
+
+
+# ----------------------
+# CURRENT USER / LOGOUT
+# ----------------------
+@auth_bp.route("/me", methods=["GET"])
+@require_auth
+def me():
+    """Return the user the bearer token belongs to"""
+    user = users_store.get("id", g.user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify({
+        "id": user["id"],
+        "fullName": user["fullName"],
+        "email": user["email"],
+        "role": user["role"]
+    }), 200
+
+
+@auth_bp.route("/logout", methods=["POST"])
+@require_auth
+def logout():
+    revoke_token(bearer_token())
+    return jsonify({"message": "Logged out"}), 200
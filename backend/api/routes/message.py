@@ -1,36 +1,49 @@
 from flask import Blueprint, request, jsonify
-import json, os, uuid
+import os, uuid
 from datetime import datetime
+from api.config import Config
+from api.journal import MessageJournal
+from api.models import Message
+from api.sqlstore import SqlStore
+from api.tasks import run_periodically
 
 messages_bp = Blueprint("messages", __name__, url_prefix="/api/messages")
 
 MESSAGES_FILE = os.path.join(os.path.dirname(__file__), "..", "messages.json")
+MESSAGES_LOG = os.path.join(os.path.dirname(__file__), "..", "messages.jsonl")
+
+if Config.STORAGE_BACKEND == "sql":
+    message_store = SqlStore(Message)
+else:
+    # Append-only log indexed by tutor; imports messages.json the first time
+    message_store = MessageJournal(MESSAGES_LOG, key="tutor_id", legacy_path=MESSAGES_FILE)
 
 
 # ---------------------- Helpers ----------------------
 def load_messages():
-    if not os.path.exists(MESSAGES_FILE):
-        return []
-    try:
-        with open(MESSAGES_FILE, "r") as f:
-            data = f.read().strip()
-            if not data:
-                return []
-            return json.loads(data)
-    except json.JSONDecodeError:
-        return []
+    return message_store.all()
 
 
 def save_messages(messages):
-    with open(MESSAGES_FILE, "w") as f:
-        json.dump(messages, f, indent=4)
+    """Replace the whole message history (rewrites the log)"""
+    message_store.save(messages)
+
+
+def start_message_compaction():
+    """Periodically squeeze edit/delete tombstones out of the log"""
+    if not isinstance(message_store, MessageJournal):
+        return None
+    return run_periodically(
+        Config.MESSAGE_COMPACT_INTERVAL,
+        lambda: message_store.compact(Config.MESSAGE_COMPACT_MIN_DEAD),
+        name="message-compaction",
+    )
 
 
 # ---------------------- GET: Messages for a Tutor ----------------------
 @messages_bp.route("/<tutor_id>", methods=["GET"])
 def get_messages(tutor_id):
-    all_messages = load_messages()
-    tutor_messages = [m for m in all_messages if m["tutor_id"] == tutor_id]
+    tutor_messages = message_store.filter("tutor_id", tutor_id)
     # Sort by timestamp ascending
     tutor_messages.sort(key=lambda x: x["timestamp"])
     return jsonify({"messages": tutor_messages})
@@ -53,9 +66,7 @@ def send_message(tutor_id):
         "timestamp": datetime.utcnow().isoformat()
     }
 
-    messages = load_messages()
-    messages.append(new_message)
-    save_messages(messages)
+    message_store.insert(new_message)
 
     return jsonify({"message": new_message}), 201
 
@@ -63,9 +74,9 @@ def send_message(tutor_id):
 # ---------------------- DELETE: Remove a Message ----------------------
 @messages_bp.route("/<tutor_id>/delete/<msg_id>", methods=["DELETE"])
 def delete_message(tutor_id, msg_id):
-    messages = load_messages()
-    messages = [m for m in messages if not (m["id"] == msg_id and m["tutor_id"] == tutor_id)]
-    save_messages(messages)
+    existing = message_store.get("id", msg_id)
+    if existing and existing["tutor_id"] == tutor_id:
+        message_store.delete("id", msg_id)
     return jsonify({"success": True})
 
 
@@ -78,16 +89,12 @@ def edit_message(tutor_id, msg_id):
     if not new_text:
         return jsonify({"error": "Message text required"}), 400
 
-    messages = load_messages()
-    edited = False
-    for m in messages:
-        if m["id"] == msg_id and m["tutor_id"] == tutor_id:
-            m["message"] = new_text
-            m["timestamp"] = datetime.utcnow().isoformat()
-            edited = True
-            break
-    if not edited:
+    existing = message_store.get("id", msg_id)
+    if not existing or existing["tutor_id"] != tutor_id:
         return jsonify({"error": "Message not found"}), 404
 
-    save_messages(messages)
+    m = message_store.update("id", msg_id, {
+        "message": new_text,
+        "timestamp": datetime.utcnow().isoformat()
+    })
     return jsonify({"message": m})
@@ -1,5 +1,16 @@
-from flask import Blueprint, request, jsonify
-import requests
+from flask import Blueprint, g, request, jsonify
+from flask_socketio import join_room, leave_room
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from api.config import Config
+from api.flutterwave import FlutterwaveClient, GatewayError, GatewayUnavailable
+from api.models import db, Payment
+from api.tasks import run_periodically
+from api.tokens import require_auth, validate_token
+from . import video
+import hmac
 import os
 from dotenv import load_dotenv
 
@@ -8,12 +19,33 @@ load_dotenv()
 payments_bp = Blueprint("payments", __name__)
 
 FLUTTERWAVE_SECRET_KEY = os.getenv("FLUTTERWAVE_SECRET_KEY")
-FLUTTERWAVE_BASE_URL = "https://api.flutterwave.com/v3"
+# Point at api/fake_gateway.py for local runs and tests
+FLUTTERWAVE_BASE_URL = os.getenv("FLUTTERWAVE_BASE_URL", "https://api.flutterwave.com/v3")
+# "Secret hash" set on the Flutterwave dashboard; sent back as verif-hash on webhooks
+FLUTTERWAVE_SECRET_HASH = os.getenv("FLUTTERWAVE_SECRET_HASH")
+
+flutterwave = FlutterwaveClient(FLUTTERWAVE_SECRET_KEY, FLUTTERWAVE_BASE_URL)
+
+# Flutterwave transaction status -> ledger status
+GATEWAY_STATUSES = {"successful": "completed", "failed": "failed", "cancelled": "failed"}
+# Ledger statuses no gateway event may change
+FINAL_STATUSES = {"completed", "failed"}
+
+
+@payments_bp.errorhandler(GatewayUnavailable)
+def gateway_unavailable(e):
+    return jsonify({"error": "Payment gateway unavailable, please try again"}), 503, {
+        "Retry-After": str(e.retry_after or 1)
+    }
+
+
+@payments_bp.errorhandler(GatewayError)
+def gateway_error(e):
+    return jsonify({"error": str(e)}), 502
 
-# In-memory storage
-payments = []
 
 @payments_bp.route("/", methods=["POST"])
+@require_auth
 def create_payment():
     """
     Initialize a payment with Flutterwave
@@ -22,6 +54,8 @@ def create_payment():
     method = data.get("method")
     amount = data.get("amount")
     currency = "MWK"  # Malawi Kwacha
+    # the ledger row (and its Socket.IO pushes) belong to the caller, never a body field
+    user_id = g.user_id
 
     if not method or not amount:
         return jsonify({"error": "Missing payment method or amount"}), 400
@@ -42,50 +76,213 @@ def create_payment():
             "bank": data.get("bank"),
             "account_number": data.get("account_number"),
             "mobile_provider": data.get("mobile_provider"),
-            "country_code": data.get("country_code")
+            "country_code": data.get("country_code"),
+            "userId": user_id
         }
     }
 
-    headers = {
-        "Authorization": f"Bearer {FLUTTERWAVE_SECRET_KEY}",
-        "Content-Type": "application/json"
-    }
-
     try:
-        r = requests.post(f"{FLUTTERWAVE_BASE_URL}/payments", json=payment_payload, headers=headers)
-        resp = r.json()
+        resp = flutterwave.create_payment(payment_payload)
         if resp.get("status") == "success":
-            payments.append({
-                "id": resp["data"]["id"],
-                "tx_ref": payment_payload["tx_ref"],
-                "method": method,
-                "amount": amount,
-                "status": "pending"
-            })
+            db.session.add(Payment(
+                tx_ref=payment_payload["tx_ref"],
+                flw_id=str(resp["data"].get("id") or ""),
+                user_id=user_id,
+                method=method,
+                amount=amount,
+                currency=currency,
+                status="pending"
+            ))
+            db.session.commit()
             return jsonify({"payment_link": resp["data"]["link"], "tx_ref": payment_payload["tx_ref"]})
         else:
             return jsonify({"error": resp.get("message")}), 400
+    except GatewayError:
+        raise
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @payments_bp.route("/verify/<tx_ref>", methods=["GET"])
 def verify_payment(tx_ref):
     """
-    Verify payment status by tx_ref
+    Payment status by tx_ref, from the ledger (kept current by the reconciler)
     """
-    headers = {
-        "Authorization": f"Bearer {FLUTTERWAVE_SECRET_KEY}"
-    }
+    payment = Payment.query.filter_by(tx_ref=tx_ref).first()
+    if not payment:
+        return jsonify({"error": "Payment not found"}), 404
+    return jsonify({"status": payment.status, "payment": payment.to_dict()})
+
+
+# ---------------------- Socket.IO push ----------------------
+# Clients emit "subscribe-payments" with {token} (their login token) and then
+# receive "payment-updated" when one of their payments settles.
+def user_room(user_id):
+    return f"payments:user:{user_id}"
+
+
+def push_payment_event(payment):
+    if video.socketio is None or not payment.user_id:
+        return
+    video.socketio.emit("payment-updated", {"payment": payment.to_dict()}, room=user_room(payment.user_id))
+
+
+def init_payment_events(sio):
+    @sio.on("subscribe-payments")
+    def handle_subscribe(data):
+        user_id = validate_token((data or {}).get("token"))
+        if user_id:
+            join_room(user_room(user_id))
+
+    @sio.on("unsubscribe-payments")
+    def handle_unsubscribe(data):
+        user_id = validate_token((data or {}).get("token"))
+        if user_id:
+            leave_room(user_room(user_id))
+
+
+# ---------------------- Webhook ----------------------
+@payments_bp.route("/webhook", methods=["POST"])
+def payment_webhook():
+    """
+    Flutterwave event callback: check verif-hash, then upsert the ledger by tx_ref
+    """
+    signature = request.headers.get("verif-hash", "")
+    if not FLUTTERWAVE_SECRET_HASH or not hmac.compare_digest(
+        signature.encode("utf-8"), FLUTTERWAVE_SECRET_HASH.encode("utf-8")
+    ):
+        return jsonify({"error": "Invalid signature"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    data = payload.get("data") or {}
+    tx_ref = data.get("tx_ref") or data.get("txRef")
+    if not tx_ref:
+        # not a transaction event; acknowledge so the gateway doesn't resend it
+        return jsonify({"status": "ignored"}), 200
+
+    payment, changed = upsert_from_gateway(tx_ref, data)
+    if changed:
+        push_payment_event(payment)
+    return jsonify({"status": "ok"}), 200
+
+
+def upsert_from_gateway(tx_ref, data):
+    """
+    Apply a gateway transaction to the ledger, creating the row if we never
+    saw the payment start. Redeliveries of the same event change nothing.
+    Returns (payment, changed).
+    """
+    payment = Payment.query.filter_by(tx_ref=tx_ref).first()
+    if payment is None:
+        payment = Payment(tx_ref=tx_ref, amount=data.get("amount"), currency=data.get("currency"),
+                          method=data.get("payment_type"), user_id=(data.get("meta") or {}).get("userId"),
+                          status="pending")
+        db.session.add(payment)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # another worker inserted it between our read and write
+            db.session.rollback()
+            payment = Payment.query.filter_by(tx_ref=tx_ref).first()
+    changed = apply_gateway_status(payment, data)
+    payment.last_checked_at = datetime.utcnow()
+    db.session.commit()
+    return payment, changed
+
+
+# ---------------------- Reconciliation ----------------------
+def apply_gateway_status(payment, data):
+    """
+    Copy a Flutterwave transaction's outcome onto the ledger row; True if it
+    changed. Only pending and abandoned rows move: completed and failed are
+    final, so a replayed or out-of-order event can't undo a settlement.
+    """
+    gateway_status = (data or {}).get("status")
+    if data and data.get("id") and not payment.flw_id:
+        payment.flw_id = str(data["id"])
+    if payment.status in FINAL_STATUSES:
+        return False
+    status = GATEWAY_STATUSES.get(gateway_status, payment.status)
+    changed = status != payment.status
+    payment.status = status
+    payment.gateway_status = gateway_status or payment.gateway_status
+    return changed
+
+
+def pending_cutoff():
+    return datetime.utcnow() - timedelta(hours=Config.PAYMENT_PENDING_MAX_HOURS)
+
+
+def abandon_stale_payments(limit):
+    """Mark up to `limit` payments pending for over PAYMENT_PENDING_MAX_HOURS abandoned; returns them."""
+    stale = (
+        Payment.query
+        .filter(Payment.status == "pending", Payment.created_at < pending_cutoff())
+        .order_by(Payment.id)
+        .limit(limit)
+        .all()
+    )
+    for payment in stale:
+        payment.status = "abandoned"
+    db.session.commit()
+    return stale
+
+
+def claim_pending_payments(limit):
+    """
+    Stamp up to `limit` pending payments not checked within the last interval
+    and return them. The stamp is written in one UPDATE, so reconcilers in
+    other workers never pick the same rows.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=Config.PAYMENT_RECONCILE_INTERVAL)
+    due = (
+        db.session.query(Payment.id)
+        .filter(Payment.status == "pending", Payment.created_at >= pending_cutoff())
+        .filter(or_(Payment.last_checked_at.is_(None), Payment.last_checked_at < cutoff))
+        .order_by(Payment.last_checked_at)
+        .limit(limit)
+    )
+    Payment.query.filter(Payment.id.in_(due.scalar_subquery())).update(
+        {"last_checked_at": now}, synchronize_session=False
+    )
+    db.session.commit()
+    return Payment.query.filter_by(status="pending", last_checked_at=now).all()
+
+
+def _lookup(tx_ref):
+    """(tx_ref, verify response), or (tx_ref, None) to leave the payment pending"""
     try:
-        r = requests.get(f"{FLUTTERWAVE_BASE_URL}/transactions/verify_by_reference?tx_ref={tx_ref}", headers=headers)
-        resp = r.json()
-        if resp.get("status") == "success" and resp.get("data", {}).get("status") == "successful":
-            # Update local record
-            for p in payments:
-                if p["tx_ref"] == tx_ref:
-                    p["status"] = "completed"
-            return jsonify({"status": "completed", "payment": resp["data"]})
-        else:
-            return jsonify({"status": "pending", "data": resp.get("data")})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return tx_ref, flutterwave.verify_by_reference(tx_ref)
+    except GatewayUnavailable:
+        return tx_ref, None
+    except GatewayError as e:
+        # one bad answer must not abort the batch; retried next interval
+        print(f"Verifying payment {tx_ref} failed:", e)
+        return tx_ref, None
+
+
+def reconcile_payments():
+    """Verify one batch of pending payments with the gateway; returns how many settled."""
+    for payment in abandon_stale_payments(Config.PAYMENT_RECONCILE_BATCH):
+        push_payment_event(payment)
+    batch = claim_pending_payments(Config.PAYMENT_RECONCILE_BATCH)
+    if not batch:
+        return 0
+    with ThreadPoolExecutor(max_workers=Config.PAYMENT_RECONCILE_WORKERS) as pool:
+        results = dict(pool.map(_lookup, [p.tx_ref for p in batch]))
+
+    settled = 0
+    for payment in batch:
+        resp = results.get(payment.tx_ref)
+        if resp and resp.get("status") == "success" and apply_gateway_status(payment, resp.get("data")):
+            settled += 1
+    db.session.commit()
+    for payment in batch:
+        if payment.status != "pending":
+            push_payment_event(payment)
+    return settled
+
+
+def start_payment_reconciler(app):
+    return run_periodically(Config.PAYMENT_RECONCILE_INTERVAL, reconcile_payments,
+                            name="payment-reconciler", app=app)
@@ -1,17 +1,14 @@
 from flask import Blueprint, request, jsonify
-from flask_mail import Mail, Message
-import uuid
+from flask_mail import Message
+from api.config import Config
+from api.mailqueue import mail_queue
+from api.models import db, ResetToken, purge_expired
+from api.tasks import run_periodically
+import secrets
 import datetime
 
 reset_bp = Blueprint('reset', __name__, url_prefix='/api/reset')
 
-# In-memory storage for demo purposes
-# In production, store tokens in a database
-reset_tokens = {}
-
-# Configure Flask-Mail separately in your app
-mail = Mail()
-
 
 @reset_bp.route('/request', methods=['POST'])
 def request_reset():
@@ -26,16 +23,17 @@ def request_reset():
         return jsonify({'error': 'Email is required'}), 400
 
     # Generate a unique token
-    token = str(uuid.uuid4())
-    expires_at = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.datetime.utcnow() + datetime.timedelta(minutes=Config.RESET_TOKEN_MINUTES)
 
-    # Save token with email and expiry
-    reset_tokens[token] = {'email': email, 'expires_at': expires_at}
+    # Save token with email and expiry (shared by all workers)
+    db.session.add(ResetToken(token=token, email=email, expires_at=expires_at))
+    db.session.commit()
 
     # Construct reset link (frontend URL)
     reset_link = f"https://pakachere.onrender.com/reset-password/{token}"
 
-    # Send email
+    # Queue the email; the mail queue thread does the SMTP work
     try:
         msg = Message(
             subject="Password Reset Request",
@@ -43,7 +41,7 @@ def request_reset():
             recipients=[email],
             body=f"Click the link to reset your password: {reset_link}"
         )
-        mail.send(msg)
+        mail_queue.send(msg)
     except Exception as e:
         print("Email failed:", e)
         # For demo, we just print the link
@@ -57,14 +55,14 @@ def verify_token(token):
     """
     Verify the reset token is valid
     """
-    token_data = reset_tokens.get(token)
+    token_data = db.session.get(ResetToken, token)
     if not token_data:
         return jsonify({'valid': False, 'error': 'Invalid token'}), 400
 
-    if datetime.datetime.utcnow() > token_data['expires_at']:
+    if datetime.datetime.utcnow() > token_data.expires_at:
         return jsonify({'valid': False, 'error': 'Token expired'}), 400
 
-    return jsonify({'valid': True, 'email': token_data['email']})
+    return jsonify({'valid': True, 'email': token_data.email})
 
 
 @reset_bp.route('/reset', methods=['POST'])
@@ -77,18 +75,28 @@ def reset_password():
     token = data.get('token')
     new_password = data.get('new_password')
 
-    token_data = reset_tokens.get(token)
+    token_data = db.session.get(ResetToken, token) if token else None
     if not token_data:
         return jsonify({'success': False, 'error': 'Invalid token'}), 400
 
-    if datetime.datetime.utcnow() > token_data['expires_at']:
+    if datetime.datetime.utcnow() > token_data.expires_at:
         return jsonify({'success': False, 'error': 'Token expired'}), 400
 
+    # Remove token after use; the delete is the claim, so only one request
+    # can use it even when two arrive on different workers
+    email = token_data.email
+    claimed = ResetToken.query.filter_by(token=token).delete()
+    db.session.commit()
+    if not claimed:
+        return jsonify({'success': False, 'error': 'Invalid token'}), 400
+
     # Here you would update the user's password in your DB
-    email = token_data['email']
     print(f"Password for {email} has been updated to: {new_password}")
 
-    # Remove token after use
-    reset_tokens.pop(token)
-
     return jsonify({'success': True, 'message': 'Password has been reset successfully'})
+
+
+def start_reset_token_purge(app):
+    """Drop expired reset tokens in the background so the table stays small."""
+    return run_periodically(Config.TOKEN_SWEEP_INTERVAL, lambda: purge_expired(ResetToken),
+                            name="reset-token-purge", app=app)
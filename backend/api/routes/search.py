@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify
+from api.etag import conditional
+from api.models import TutorVideo, TutorPaper, dataset_version
+from api.pagination import PaginationError, encode_cursor, page_args, project
+from api.search import DEFAULT_LIMIT, KINDS, load_hits, match_expression, search
+from .tutors import catalog_item
+
+search_bp = Blueprint("search", __name__)
+
+
+# =========================
+# Search tutorial videos and papers
+# GET /api/search?q=alg&type=video&subject=&uploader=&limit=&cursor=&fields=
+# =========================
+@search_bp.route("", methods=["GET"])
+@conditional(lambda: (dataset_version(TutorVideo.__tablename__), dataset_version(TutorPaper.__tablename__)))
+def search_catalog():
+    """Ranked prefix search over title, description, uploader and subject"""
+    kind = request.args.get("type") or None
+    if kind is not None and kind not in KINDS:
+        return jsonify({"error": "type must be 'video' or 'paper'"}), 400
+
+    match = match_expression(
+        request.args.get("q"),
+        subject=request.args.get("subject"),
+        uploader=request.args.get("uploader"),
+    )
+    if not match:
+        return jsonify({"error": "q is required"}), 400
+
+    try:
+        limit, cursor, fields = page_args()
+        after = (float(cursor[0]), int(cursor[1])) if cursor else None
+    except (PaginationError, ValueError, TypeError, IndexError):
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    hits, last = search(match, kind=kind, limit=limit or DEFAULT_LIMIT, after=after)
+    results = [project({**catalog_item(item), "type": item_kind}, fields) for item_kind, item in load_hits(hits)]
+    return jsonify({"results": results, "nextCursor": encode_cursor(list(last)) if last else None})
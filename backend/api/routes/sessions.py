@@ -1,31 +1,215 @@
 from flask import Blueprint, request, jsonify
-import json, os, uuid
-from datetime import datetime
+from flask_socketio import join_room, leave_room
+import os, threading, uuid
+from datetime import datetime, timedelta, timezone
+from api.config import Config
+from api.db import users_store
+from api.intervals import IntervalIndex
+from api.models import TutoringSession
+from api.store import open_store
+from api.tokens import validate_token
+from . import video
+from .tutors import tutors_store
 
 sessions_bp = Blueprint("sessions", __name__, url_prefix="/api/sessions")
 
 SESSIONS_FILE = os.path.join(os.path.dirname(__file__), "..", "sessions.json")
 
+SESSION_STATUSES = {"pending", "approved", "rejected", "cancelled", "completed"}
+# statuses that keep the tutor's time slot taken
+BLOCKING_STATUSES = {"pending", "approved"}
+
+
+sessions_store = open_store(SESSIONS_FILE, TutoringSession, indexes=("id", "tutorId", "student_email"))
+
 
 # ---------------------- Helpers ----------------------
 def load_sessions():
-    """Load all saved sessions from JSON file"""
-    if not os.path.exists(SESSIONS_FILE):
-        return []
-    try:
-        with open(SESSIONS_FILE, "r") as f:
-            data = f.read().strip()
-            if not data:
-                return []
-            return json.loads(data)
-    except json.JSONDecodeError:
-        return []
+    """Load all saved sessions"""
+    return sessions_store.all()
 
 
 def save_sessions(sessions):
-    """Save all sessions to JSON file"""
-    with open(SESSIONS_FILE, "w") as f:
-        json.dump(sessions, f, indent=4)
+    """Replace all saved sessions"""
+    sessions_store.save(sessions)
+
+
+def parse_session_time(value):
+    """ISO string -> naive UTC datetime, or None if it can't be parsed"""
+    try:
+        dt = datetime.fromisoformat(str(value).replace(" ", "T"))
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def session_interval(session):
+    start = parse_session_time(session.get("session_time"))
+    if start is None:
+        return None
+    try:
+        end = start + timedelta(minutes=int(session.get("duration_minutes") or Config.SESSION_DEFAULT_MINUTES))
+    except (TypeError, ValueError, OverflowError):
+        # hand-edited or legacy rows: fall back rather than fail every rebuild
+        end = start + timedelta(minutes=Config.SESSION_DEFAULT_MINUTES)
+    return start, end
+
+
+# ---------------------- Booking interval index ----------------------
+# Per-tutor sorted intervals of the blocking sessions. Rebuilt from the store
+# only when another worker changed it; local writes update it in place.
+# _bookings_lock covers the index and its version: hold it around
+# booking_index() and every use of what it returns (writers take it inside
+# sessions_store.write_lock()).
+_bookings = IntervalIndex()
+_bookings_version = None
+_bookings_lock = threading.Lock()
+
+
+def booking_index():
+    global _bookings, _bookings_version
+    version = sessions_store.version
+    if version != _bookings_version:
+        index = IntervalIndex()
+        for s in sessions_store.iter_all():
+            interval = session_interval(s)
+            if interval and s.get("status", "pending") in BLOCKING_STATUSES:
+                index.add(s.get("tutorId"), *interval, s["id"])
+        _bookings, _bookings_version = index, version
+    return _bookings
+
+
+def mark_bookings_synced():
+    global _bookings_version
+    _bookings_version = sessions_store.version
+
+
+def resolve_tutor_id(tutor_id):
+    """Dashboards know the tutor's user id; sessions are keyed by tutor record id"""
+    tutor = tutors_store.get("userId", tutor_id)
+    return tutor["id"] if tutor else tutor_id
+
+
+# ---------------------- Socket.IO push ----------------------
+# Clients emit "subscribe-sessions" with {token} (their login token) and then
+# receive "session-created" / "session-updated" for their own bookings
+# instead of polling.
+def tutor_room(tutor_id):
+    return f"sessions:tutor:{tutor_id}"
+
+
+def student_room(student_email):
+    return f"sessions:student:{student_email.strip().lower()}"
+
+
+def session_rooms(user_id):
+    """Rooms of the bookings a user may see: as the tutor, and as the student (by email)"""
+    rooms = []
+    tutor = tutors_store.get("userId", user_id)
+    if tutor:
+        rooms.append(tutor_room(tutor["id"]))
+    user = users_store.get("id", user_id)
+    if user and user.get("email"):
+        rooms.append(student_room(user["email"]))
+    return rooms
+
+
+def push_session_event(event, session):
+    if video.socketio is None:
+        return
+    video.socketio.emit(event, {"session": session}, room=tutor_room(session["tutorId"]))
+    if session.get("student_email"):
+        video.socketio.emit(event, {"session": session}, room=student_room(session["student_email"]))
+
+
+def init_session_events(sio):
+    @sio.on("subscribe-sessions")
+    def handle_subscribe(data):
+        user_id = validate_token((data or {}).get("token"))
+        if user_id:
+            for room in session_rooms(user_id):
+                join_room(room)
+
+    @sio.on("unsubscribe-sessions")
+    def handle_unsubscribe(data):
+        user_id = validate_token((data or {}).get("token"))
+        if user_id:
+            for room in session_rooms(user_id):
+                leave_room(room)
+
+
+# ---------------------- GET: List Sessions ----------------------
+@sessions_bp.route("/", methods=["GET"])
+def list_sessions():
+    """Sessions for ?tutorId= (tutor or user id) and/or ?student_email=, soonest first"""
+    tutor_id = request.args.get("tutorId")
+    student_email = request.args.get("student_email", "").strip().lower()
+    if not tutor_id and not student_email:
+        return jsonify({"error": "tutorId or student_email is required"}), 400
+
+    if tutor_id:
+        sessions = sessions_store.filter("tutorId", resolve_tutor_id(tutor_id))
+        if student_email:
+            sessions = [s for s in sessions if s.get("student_email") == student_email]
+    else:
+        sessions = sessions_store.filter("student_email", student_email)
+
+    sessions.sort(key=lambda s: s.get("session_time", ""))
+    return jsonify({"sessions": sessions}), 200
+
+
+# ---------------------- GET: Next Free Slot ----------------------
+@sessions_bp.route("/next-free", methods=["GET"])
+def next_free_slot():
+    """Earliest start at/after ?after= (default now) with ?duration_minutes= free"""
+    tutor_id = request.args.get("tutorId")
+    if not tutor_id:
+        return jsonify({"error": "tutorId is required"}), 400
+    after = parse_session_time(request.args["after"]) if request.args.get("after") else datetime.utcnow()
+    try:
+        duration = int(request.args.get("duration_minutes", Config.SESSION_DEFAULT_MINUTES))
+    except ValueError:
+        duration = None
+    if after is None or not duration or duration <= 0:
+        return jsonify({"error": "Invalid after or duration_minutes"}), 400
+
+    tutor_id = resolve_tutor_id(tutor_id)
+    with _bookings_lock:
+        start = booking_index().next_free(tutor_id, after, timedelta(minutes=duration))
+    return jsonify({"tutorId": tutor_id, "start": start.isoformat(), "duration_minutes": duration}), 200
+
+
+# ---------------------- POST: Update Session Status ----------------------
+@sessions_bp.route("/<session_id>/status", methods=["POST"])
+def update_session_status(session_id):
+    data = request.get_json() or {}
+    status = data.get("status")
+    if status not in SESSION_STATUSES:
+        return jsonify({"error": f"status must be one of: {', '.join(sorted(SESSION_STATUSES))}"}), 400
+
+    with sessions_store.write_lock(), _bookings_lock:
+        index = booking_index()
+        previous = sessions_store.get("id", session_id)
+        if not previous:
+            return jsonify({"error": "Session not found"}), 404
+
+        interval = session_interval(previous)
+        was_blocking = previous.get("status", "pending") in BLOCKING_STATUSES
+        if interval and status in BLOCKING_STATUSES and not was_blocking:
+            if index.overlapping(previous["tutorId"], *interval):
+                return jsonify({"error": "That time slot has been booked since."}), 409
+
+        session = sessions_store.update("id", session_id, {"status": status})
+        if interval and was_blocking and status not in BLOCKING_STATUSES:
+            index.remove(session["tutorId"], interval[0], session_id)
+        elif interval and status in BLOCKING_STATUSES and not was_blocking:
+            index.add(session["tutorId"], *interval, session_id)
+        mark_bookings_synced()
+
+    push_session_event("session-updated", session)
+    return jsonify({"message": "Session updated", "session": session}), 200
 
 
 # ---------------------- POST: Create New Session (Booking) ----------------------
@@ -46,6 +230,12 @@ def create_session():
     tutor_name = data["tutor_name"]
     session_time = data["session_time"]
     topic = data["topic"].strip()
+    try:
+        duration = int(data.get("duration_minutes") or Config.SESSION_DEFAULT_MINUTES)
+    except (TypeError, ValueError):
+        duration = 0
+    if not 0 < duration <= 8 * 60:
+        return jsonify({"error": "duration_minutes must be between 1 and 480."}), 400
 
     # ------------------ FIX: Normalize session_time ------------------
     try:
@@ -56,19 +246,14 @@ def create_session():
         if len(session_time.split("T")[-1].split(":")) == 2:
             session_time += ":00"
 
-        dt = datetime.fromisoformat(session_time)
+        dt = parse_session_time(session_time)
+        if dt is None:
+            raise ValueError(session_time)
         if dt < datetime.utcnow():
             return jsonify({"error": "Session time must be in the future."}), 400
     except Exception:
         return jsonify({"error": "Invalid session_time format."}), 400
 
-    sessions = load_sessions()
-
-    # Prevent duplicate booking for the same student, tutor, and time
-    for s in sessions:
-        if s["student_email"] == student_email and s["tutorId"] == tutor_id and s["session_time"] == session_time:
-            return jsonify({"error": "You already booked this tutor for that time."}), 400
-
     new_session = {
         "id": str(uuid.uuid4()),
         "student_name": student_name,
@@ -77,11 +262,22 @@ def create_session():
         "tutor_name": tutor_name,
         "session_time": session_time,
         "topic": topic,
+        "duration_minutes": duration,
         "status": "pending",  # default status
         "created_at": datetime.utcnow().isoformat()
     }
 
-    sessions.append(new_session)
-    save_sessions(sessions)
+    # Check and insert under the store's cross-worker lock, so two requests
+    # can't both grab the same slot
+    with sessions_store.write_lock(), _bookings_lock:
+        index = booking_index()
+        end = dt + timedelta(minutes=duration)
+        if index.overlapping(tutor_id, dt, end):
+            return jsonify({"error": "This tutor is already booked for that time."}), 409
+        sessions_store.insert(new_session)
+        index.add(tutor_id, dt, end, new_session["id"])
+        mark_bookings_synced()
+
+    push_session_event("session-created", new_session)
 
     return jsonify({"message": "Session booked successfully!", "session": new_session}), 201
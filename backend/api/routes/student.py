@@ -1,8 +1,13 @@
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, request, jsonify, send_file, send_from_directory
 import os
-import json
 import uuid
 from werkzeug.utils import secure_filename
+from api.config import Config
+from api.etag import conditional
+from api.images import FORMATS, ImageVariants
+from api.jsonstream import stream_json
+from api.models import Student
+from api.store import open_store
 
 students_bp = Blueprint("students", __name__, url_prefix="/api/students")
 
@@ -15,6 +20,8 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, "..", "uploads", "students")
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+avatar_variants = ImageVariants(UPLOAD_FOLDER)
+
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
 
 def allowed_file(filename):
@@ -24,21 +31,24 @@ def allowed_file(filename):
 # -------------------------
 # Helper Functions
 # -------------------------
+AVATAR_PATH = "/api/students/avatars/"
+
+def avatar_variant_url(url, size):
+    """URL of the `size` variant for one of our avatar URLs; other URLs unchanged"""
+    if not url or AVATAR_PATH not in url:
+        return url
+    prefix, _, filename = url.rpartition(AVATAR_PATH)
+    if "/" in filename:
+        return url  # already a variant
+    return f"{prefix}{AVATAR_PATH}{size}/{filename}"
+
+students_store = open_store(DATA_FILE, Student, indexes=("id", "email"))
+
 def load_students():
-    if not os.path.exists(DATA_FILE):
-        return []
-    try:
-        with open(DATA_FILE, "r") as f:
-            data = f.read().strip()
-            if not data:
-                return []
-            return json.loads(data)
-    except json.JSONDecodeError:
-        return []
+    return students_store.all()
 
 def save_students(students):
-    with open(DATA_FILE, "w") as f:
-        json.dump(students, f, indent=4)
+    students_store.save(students)
 
 
 # -------------------------
@@ -58,9 +68,15 @@ def upload_avatar():
         filename = secure_filename(file.filename)
         unique_name = f"{uuid.uuid4()}_{filename}"
         file.save(os.path.join(UPLOAD_FOLDER, unique_name))
+        if not avatar_variants.generate(unique_name):
+            os.remove(os.path.join(UPLOAD_FOLDER, unique_name))
+            return jsonify({"error": "File is not a readable image"}), 400
         return jsonify({
             "message": "Avatar uploaded successfully",
-            "avatarUrl": f"/api/students/avatars/{unique_name}"
+            "avatarUrl": f"/api/students/avatars/{unique_name}",
+            "avatarVariants": {
+                size: f"/api/students/avatars/{size}/{unique_name}" for size in Config.AVATAR_SIZES
+            }
         }), 200
     return jsonify({"error": "Invalid file type"}), 400
 
@@ -71,6 +87,19 @@ def get_avatar(filename):
     return send_from_directory(UPLOAD_FOLDER, filename)
 
 
+# ✅ Serve a resized copy: WebP when the browser takes it, JPEG otherwise
+@students_bp.route("/avatars/<int:size>/<filename>")
+def get_avatar_variant(size, filename):
+    ext = "webp" if "image/webp" in request.accept_mimetypes.values() else "jpg"
+    path = avatar_variants.get(size, filename, ext)
+    if path is None:
+        return jsonify({"error": "Image not found"}), 404
+    response = send_file(path, mimetype=FORMATS[ext][1], max_age=Config.AVATAR_CACHE_SECONDS, conditional=True)
+    response.cache_control.immutable = True
+    response.vary.add("Accept")
+    return response
+
+
 # ✅ Create or update student profile
 @students_bp.route("/profile", methods=["POST"])
 def save_student_profile():
@@ -82,8 +111,7 @@ def save_student_profile():
     if not email:
         return jsonify({"error": "Email is required"}), 400
 
-    students = load_students()
-    existing = next((s for s in students if s.get("email") == email), None)
+    existing = students_store.get("email", email)
 
     student_data = {
         "id": str(uuid.uuid4()) if not existing else existing["id"],
@@ -96,22 +124,18 @@ def save_student_profile():
     }
 
     if existing:
-        students = [student_data if s["email"] == email else s for s in students]
+        students_store.update("email", email, student_data)
     else:
-        students.append(student_data)
+        students_store.insert(student_data)
 
-    save_students(students)
     return jsonify({"message": "Profile saved successfully", "student": student_data}), 201
 
 
 # ✅ Get student profile by email or ID
 @students_bp.route("/profile/<identifier>", methods=["GET"])
+@conditional(lambda: students_store.version)
 def get_student_profile(identifier):
-    students = load_students()
-    student = next(
-        (s for s in students if s.get("id") == identifier or s.get("email") == identifier),
-        None,
-    )
+    student = students_store.get("id", identifier) or students_store.get("email", identifier)
     if not student:
         return jsonify({"error": "Student not found"}), 404
     return jsonify(student), 200
@@ -120,16 +144,12 @@ def get_student_profile(identifier):
 # ✅ Get all students
 @students_bp.route("/all", methods=["GET"])
 def get_all_students():
-    students = load_students()
-    return jsonify(students), 200
+    return stream_json(students_store.iter_all())
 
 
 # ✅ Delete student
 @students_bp.route("/delete/<student_id>", methods=["DELETE"])
 def delete_student(student_id):
-    students = load_students()
-    updated = [s for s in students if s["id"] != student_id]
-    if len(updated) == len(students):
+    if not students_store.delete("id", student_id):
         return jsonify({"error": "Student not found"}), 404
-    save_students(updated)
     return jsonify({"message": "Student deleted successfully"}), 200
@@ -1,70 +1,132 @@
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, request, jsonify
 import json
+import math
 import uuid
+from bisect import bisect_right
+from itertools import chain
 from datetime import datetime
 import os
-from api.db import load_users
+from api.db import users_store
 from api.config import Config
-from api.models import db, TutorVideo, TutorPaper
+from api.store import open_store
+from api.etag import conditional
+from api.blobs import blob_store
+from api.models import db, TutorVideo, TutorPaper, Tutor, Review, TutorRating, dataset_version
+from api.jsonstream import stream_json
+from .student import avatar_variant_url
+from api.pagination import PaginationError, encode_cursor, page_args, project
+from api.sendfile import send_upload
+from api.transcode import transcoder
+from api.tutorindex import TutorIndex
+from api.ratings import NO_REVIEWS, best_rated, rating_summaries, ratings_version, rebuild_ratings, record_review
+from api.tasks import run_periodically
+from api.uploads import ChunkedUploads, UploadError
+from sqlalchemy import and_, or_
 
 tutors_bp = Blueprint("tutors", __name__, url_prefix="/api/tutors")
 
 TUTORS_FILE = os.path.join(os.path.dirname(__file__), "..", "tutors.json")
+REVIEWS_FILE = os.path.join(os.path.dirname(__file__), "..", "reviews.json")
 BACKEND_URL = "https://supreme-train-pjpvw497vvqqf7559-5000.app.github.dev/api"
 
 # ----------------------
 # Load/Save helpers
 # ----------------------
+tutors_store = open_store(TUTORS_FILE, Tutor, indexes=("id", "userId"))
+tutor_index = TutorIndex(tutors_store)
+
 def load_tutors():
-    if not os.path.exists(TUTORS_FILE):
-        return []
-    try:
-        with open(TUTORS_FILE, "r") as f:
-            data = f.read().strip()
-            if not data:
-                return []
-            return json.loads(data)
-    except json.JSONDecodeError:
-        return []
+    return tutors_store.all()
 
 def save_tutors(tutors):
-    with open(TUTORS_FILE, "w") as f:
-        json.dump(tutors, f, indent=4)
+    tutors_store.save(tutors)
+
+def flatten_reviews(reviews):
+    """Old reviews.json layout: {tutor_id: [review, ...]} -> list with tutorId set"""
+    if not isinstance(reviews, dict):
+        return []
+    return [
+        {**review, "tutorId": tutor_id}
+        for tutor_id, tutor_reviews in reviews.items()
+        for review in tutor_reviews
+    ]
+
+reviews_store = open_store(REVIEWS_FILE, Review, indexes=("id", "tutorId"), normalize=flatten_reviews)
 
 def load_reviews():
-    try:
-        with open("reviews.json", "r") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
+    return reviews_store.all()
 
 def save_reviews(reviews):
-    with open("reviews.json", "w") as f:
-        json.dump(reviews, f, indent=4)
+    reviews_store.save(reviews)
+
+def ensure_rating_aggregates():
+    """Build the per-tutor aggregates from the stored reviews if there are none yet"""
+    with reviews_store.write_lock():
+        if TutorRating.query.first() is None and reviews_store.all():
+            rebuild_ratings(reviews_store.iter_all())
+
+# ----------------------
+# Enriched tutor listing
+# ----------------------
+DEFAULT_TUTOR_PHOTO = "https://via.placeholder.com/100?text=Tutor"
+
+# (tutors version, users version, ratings version) -> ready-to-serve list,
+# plus the same tutors sorted by id and their sorted ids, for keyset paging
+_enriched_tutors = (None, [], [], [])
+
+def enrich_tutor(tutor, ratings):
+    """
+    Copy of a tutor record with the owning user's name and photo joined in,
+    and its review aggregates from `ratings` (see rating_summaries()).
+    """
+    user = users_store.get("id", tutor.get("userId"))
+
+    tutor_data = tutor.copy()
+    tutor_data["name"] = user.get("fullName", "Unnamed Tutor") if user else "Unnamed Tutor"
+    tutor_data["profilePhoto"] = user.get("profilePhoto", DEFAULT_TUTOR_PHOTO) if user else DEFAULT_TUTOR_PHOTO
+    # cards show ~100px photos; no need to send the original
+    tutor_data["profilePhotoThumb"] = avatar_variant_url(tutor_data["profilePhoto"], 100)
+
+    if isinstance(tutor_data.get("subjects"), list):
+        tutor_data["subjects"] = ", ".join(tutor_data["subjects"])
+
+    # replaces the static rating/reviewsCount some records carry
+    tutor_data.update(ratings.get(str(tutor.get("id")), NO_REVIEWS))
+    return tutor_data
+
+def tutors_version():
+    """Changes whenever tutors, the users joined into them or their ratings change"""
+    return (tutors_store.version, users_store.version, ratings_version())
+
+def get_enriched_tutors():
+    """
+    All tutors joined with their users and ratings. The joins are hash lookups
+    (users `id` index, one read of the aggregates table) and the result is
+    kept until tutors.json, users.json or a rating changes.
+    """
+    return _enriched()[1]
+
+def _enriched():
+    global _enriched_tutors
+    version = tutors_version()
+    if _enriched_tutors[0] != version:
+        ratings = rating_summaries()
+        tutors = [enrich_tutor(t, ratings) for t in load_tutors()]
+        by_id = sorted(tutors, key=lambda t: str(t.get("id")))
+        _enriched_tutors = (version, tutors, by_id, [str(t.get("id")) for t in by_id])
+    return _enriched_tutors
+
+def enriched_tutors_by_id():
+    """(tutors sorted by id as a string, their ids): the keyset order of /all pages"""
+    return _enriched()[2:]
 
 # ----------------------
 # GET ALL TUTORS (frontend /api/tutors/)
 # ----------------------
 @tutors_bp.route("/", methods=["GET"])
+@conditional(tutors_version)
 def get_tutors_root():
-    tutors = load_tutors()
-    users = load_users()
-
-    enriched_tutors = []
-    for tutor in tutors:
-        user_id = tutor.get("userId")
-        user = next((u for u in users if u.get("id") == user_id), None)
-
-        tutor_data = tutor.copy()
-        tutor_data["name"] = user.get("fullName", "Unnamed Tutor") if user else "Unnamed Tutor"
-        tutor_data["profilePhoto"] = user.get("profilePhoto", "https://via.placeholder.com/100?text=Tutor") if user else "https://via.placeholder.com/100?text=Tutor"
-
-        if isinstance(tutor_data.get("subjects"), list):
-            tutor_data["subjects"] = ", ".join(tutor_data["subjects"])
-
-        enriched_tutors.append(tutor_data)
-
-    return jsonify({"tutors": enriched_tutors}), 200
+    return jsonify({"tutors": get_enriched_tutors()}), 200
 
 # ----------------------
 # CREATE/UPDATE TUTOR DETAILS
@@ -81,76 +143,127 @@ def add_tutor_details():
     if not all([user_id, subjects, experience, price]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    tutors = load_tutors()
-    existing = next((t for t in tutors if t.get("userId") == user_id), None)
-
-    tutor_data = {
-        "id": str(uuid.uuid4()) if not existing else existing["id"],
-        "userId": user_id,
-        "subjects": subjects.split(","),
-        "experience": experience,
-        "price": price,
-        "bio": bio,
-        "availability": json.loads(availability)
-    }
-
-    if existing:
-        tutors = [tutor_data if t.get("userId") == user_id else t for t in tutors]
-    else:
-        tutors.append(tutor_data)
+    with tutors_store.write_lock():
+        before = tutors_store.version
+        existing = tutors_store.get("userId", user_id)
+
+        tutor_data = {
+            "id": str(uuid.uuid4()) if not existing else existing["id"],
+            "userId": user_id,
+            "subjects": subjects.split(","),
+            "experience": experience,
+            "price": price,
+            "bio": bio,
+            "availability": json.loads(availability)
+        }
+
+        if existing:
+            tutor = tutors_store.update("userId", user_id, tutor_data)
+        else:
+            tutor = tutors_store.insert(tutor_data)
+        tutor_index.apply(tutor, before, tutors_store.version)
 
-    save_tutors(tutors)
     return jsonify({"message": "Tutor details saved successfully", "tutor": tutor_data}), 201
 
 # ----------------------
 # GET TUTOR PROFILE BY USER ID
 # ----------------------
 @tutors_bp.route("/profile/<user_id>", methods=["GET"])
+@conditional(tutors_version)
 def get_tutor_profile(user_id):
-    tutors = load_tutors()
-    tutor = next((t for t in tutors if t.get("userId") == user_id), None)
+    tutor = tutors_store.get("userId", user_id)
     if not tutor:
         return jsonify({"error": "Tutor not found"}), 404
+    tutor = {**tutor, **rating_summaries([tutor["id"]]).get(str(tutor["id"]), NO_REVIEWS)}
     return jsonify(tutor), 200
 
 # ----------------------
 # GET ALL TUTORS (enriched)
 # ----------------------
 @tutors_bp.route("/all", methods=["GET"])
+@conditional(tutors_version)
 def get_all_tutors():
-    tutors = load_tutors()
-    users = load_users()
-
-    enriched_tutors = []
-    for tutor in tutors:
-        user_id = tutor.get("userId")
-        user = next((u for u in users if u.get("id") == user_id), None)
-
-        tutor_data = tutor.copy()
-        tutor_data["name"] = user.get("fullName", "Unnamed Tutor") if user else "Unnamed Tutor"
-        tutor_data["profilePhoto"] = user.get("profilePhoto", "https://via.placeholder.com/100?text=Tutor") if user else "https://via.placeholder.com/100?text=Tutor"
+    """
+    ?limit=&cursor= pages through the tutors by id (keyset: the cursor is the
+    last id seen, so tutors added meanwhile never shift a page), ?fields=id,name,...
+    trims each tutor
+    """
+    try:
+        limit, cursor, fields = page_args()
+        after = str(cursor[0]) if cursor else None
+    except (PaginationError, IndexError):
+        return jsonify({"error": "Invalid pagination parameters"}), 400
 
-        if isinstance(tutor_data.get("subjects"), list):
-            tutor_data["subjects"] = ", ".join(tutor_data["subjects"])
+    if limit is None:
+        return stream_json((project(t, fields) for t in get_enriched_tutors()), key="tutors")
 
-        enriched_tutors.append(tutor_data)
+    tutors, ids = enriched_tutors_by_id()
+    start = bisect_right(ids, after) if after is not None else 0
+    page = tutors[start:start + limit]
+    next_cursor = encode_cursor([ids[start + limit - 1]]) if start + limit < len(tutors) else None
+    return jsonify({"tutors": [project(t, fields) for t in page], "nextCursor": next_cursor}), 200
 
-    return jsonify({"tutors": enriched_tutors}), 200
+# ----------------------
+# SEARCH TUTORS (faceted)
+# GET /api/tutors/search?subject=math,physics&day=Mon&minPrice=&maxPrice=&sort=price|-price|rating&limit=&cursor=&fields=
+# ----------------------
+@tutors_bp.route("/search", methods=["GET"])
+@conditional(tutors_version)
+def search_tutors():
+    """Filtered page of tutors plus subject, day and price band counts over all matches"""
+    split = lambda name: [v.strip() for v in request.args.get(name, "").split(",") if v.strip()]
+    sort = request.args.get("sort") or None
+    if sort not in (None, "price", "-price", "rating"):
+        return jsonify({"error": "sort must be 'price', '-price' or 'rating'"}), 400
+    try:
+        min_price, max_price = (
+            float(request.args[name]) if request.args.get(name) else None for name in ("minPrice", "maxPrice")
+        )
+        if not all(p is None or math.isfinite(p) for p in (min_price, max_price)):
+            raise ValueError("nan and inf are not prices")
+    except ValueError:
+        return jsonify({"error": "minPrice and maxPrice must be numbers"}), 400
+    try:
+        limit, cursor, fields = page_args()
+        start = max(int(cursor[0]), 0) if cursor else 0
+    except (PaginationError, ValueError, TypeError, IndexError):
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    limit = limit or Config.TUTOR_SEARCH_LIMIT
+    tutors, total, facets = tutor_index.search(
+        subjects=[s.lower() for s in split("subject")],
+        days=[d[:3].capitalize() for d in split("day")],
+        min_price=min_price,
+        max_price=max_price,
+        sort=sort,
+        ranked=best_rated() if sort == "rating" else None,
+        start=start,
+        limit=limit,
+    )
+    next_cursor = encode_cursor([start + limit]) if start + limit < total else None
+    ratings = rating_summaries([t["id"] for t in tutors])
+    return jsonify({
+        "tutors": [project(enrich_tutor(t, ratings), fields) for t in tutors],
+        "total": total,
+        "facets": facets,
+        "nextCursor": next_cursor,
+    }), 200
 
 # GET SINGLE TUTOR BY TUTOR ID
 @tutors_bp.route("/<tutor_id>", methods=["GET"])
+@conditional(tutors_version)
 def get_tutor(tutor_id):
-    tutors = load_tutors()
-    users = load_users()
-    tutor = next((t for t in tutors if t.get("id") == tutor_id), None)
+    tutor = tutors_store.get("id", tutor_id)
 
     if not tutor:
         return jsonify({"error": "Tutor not found"}), 404
 
-    user = next((u for u in users if u.get("id") == tutor.get("userId")), None)
+    tutor = tutor.copy()  # don't leak the enrichment into the shared cache
+    user = users_store.get("id", tutor.get("userId"))
     if user:
         tutor["name"] = user.get("name", "Unknown Tutor")
         tutor["profilePhoto"] = user.get("profilePhoto", "")
+    tutor.update(rating_summaries([tutor_id]).get(str(tutor_id), NO_REVIEWS))
 
     return jsonify({"tutor": tutor}), 200
 
@@ -159,8 +272,7 @@ def get_tutor(tutor_id):
 # ----------------------
 @tutors_bp.route("/<tutor_id>/reviews", methods=["GET"])
 def get_tutor_reviews(tutor_id):
-    reviews = load_reviews()
-    tutor_reviews = reviews.get(tutor_id, [])
+    tutor_reviews = reviews_store.filter("tutorId", tutor_id)
     return jsonify({"reviews": tutor_reviews}), 200
 
 @tutors_bp.route("/<tutor_id>/reviews", methods=["POST"])
@@ -171,18 +283,23 @@ def submit_tutor_review(tutor_id):
 
     if rating is None or comment is None:
         return jsonify({"error": "Rating and comment are required"}), 400
-
-    reviews = load_reviews()
-    tutor_reviews = reviews.get(tutor_id, [])
+    if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not 1 <= rating <= 5:
+        return jsonify({"error": "Rating must be a number from 1 to 5"}), 400
 
     new_review = {
         "id": str(uuid.uuid4()),
+        "tutorId": tutor_id,
         "rating": rating,
         "comment": comment
     }
-    tutor_reviews.append(new_review)
-    reviews[tutor_id] = tutor_reviews
-    save_reviews(reviews)
+    with reviews_store.write_lock():
+        record_review(tutor_id, rating)
+        try:
+            reviews_store.insert(new_review)  # the SQL store commits the aggregates with it
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
     return jsonify({"message": "Review added successfully", "review": new_review}), 201
 
@@ -193,6 +310,49 @@ def submit_tutor_review(tutor_id):
 os.makedirs(os.path.join(Config.UPLOAD_FOLDER, "videos"), exist_ok=True)
 os.makedirs(os.path.join(Config.UPLOAD_FOLDER, "papers"), exist_ok=True)
 
+def save_upload(item):
+    """Commit a new video/paper row; hand its blob reference back if that fails"""
+    db.session.add(item)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        blob_store.release(item.blob_key)
+        raise
+
+
+def remove_upload(item, folder):
+    """Delete a video/paper row and release its file"""
+    db.session.delete(item)
+    db.session.commit()
+    if item.blob_key:
+        unlinked = blob_store.release(item.blob_key)
+    else:
+        # uploaded before the blob store: stored under its own name
+        file_path = os.path.join(folder, item.url)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        unlinked = True
+    if unlinked and isinstance(item, TutorVideo):
+        transcoder.remove_output(transcoder.output_name(item))
+
+
+def video_item(v):
+    return {
+        "id": v.id,
+        "title": v.title,
+        "uploader": v.uploader,
+        "description": v.description,
+        "subject": v.subject,
+        "url": v.url,
+        "filename": v.filename or v.url,
+        "duration": v.duration,
+        "hls": v.hls,
+        "poster": v.poster,
+        "transcodeStatus": v.transcode_status
+    }
+
+
 # ---------------------- VIDEO UPLOAD ----------------------
 
 @tutors_bp.route("/<tutor_id>/videos", methods=["POST"])
@@ -200,24 +360,27 @@ def upload_video(tutor_id):
     title = request.form.get("title")
     uploader = request.form.get("uploader", "Tutor")
     description = request.form.get("description")
+    subject = request.form.get("subject")
     file = request.files.get("file")
 
     if not file or not title:
         return jsonify({"error": "Title and file are required"}), 400
 
-    filename = file.filename
-    save_path = os.path.join(Config.UPLOAD_FOLDER, "videos", filename)
-    file.save(save_path)
+    key, _ = blob_store.put_stream(file.stream)
+    filename = blob_store.public_name(key, file.filename)
 
     video = TutorVideo(
         tutor_id=tutor_id,
         title=title,
         uploader=uploader,
         description=description,
+        subject=subject,
         url=filename,
+        blob_key=key,
+        filename=file.filename,
     )
-    db.session.add(video)
-    db.session.commit()
+    save_upload(video)
+    transcoder.enqueue(video)
 
     return jsonify({"message": "Video uploaded successfully", "file": filename}), 200
 
@@ -225,15 +388,35 @@ def upload_video(tutor_id):
 @tutors_bp.route("/<tutor_id>/videos", methods=["GET"])
 def get_videos(tutor_id):
     videos = TutorVideo.query.filter_by(tutor_id=tutor_id).all()
-    return jsonify([
-        {
-            "id": v.id,
-            "title": v.title,
-            "uploader": v.uploader,
-            "description": v.description,
-            "url": v.url
-        } for v in videos
-    ])
+    return jsonify([video_item(v) for v in videos])
+
+
+@tutors_bp.route("/<tutor_id>/videos/<int:video_id>/transcode", methods=["GET"])
+def get_transcode_status(tutor_id, video_id):
+    """Transcoding job state and, once ready, the HLS playlist and poster"""
+    video = TutorVideo.query.filter_by(id=video_id, tutor_id=tutor_id).first()
+    if not video:
+        return jsonify({"error": "Video not found"}), 404
+    return jsonify({
+        "id": video.id,
+        "status": video.transcode_status or "none",
+        "error": video.transcode_error,
+        "duration": video.duration,
+        "hls": video.hls,
+        "poster": video.poster
+    })
+
+
+@tutors_bp.route("/<tutor_id>/videos/<int:video_id>/transcode", methods=["POST"])
+def retry_transcode(tutor_id, video_id):
+    """Queue a video for transcoding again (failed jobs, older uploads)"""
+    video = TutorVideo.query.filter_by(id=video_id, tutor_id=tutor_id).first()
+    if not video:
+        return jsonify({"error": "Video not found"}), 404
+    if video.transcode_status in ("pending", "processing"):
+        return jsonify({"error": "Video is already queued"}), 409
+    transcoder.enqueue(video)
+    return jsonify({"id": video.id, "status": video.transcode_status}), 202
 
 
 @tutors_bp.route("/<tutor_id>/videos/<int:video_id>", methods=["DELETE"])
@@ -242,12 +425,7 @@ def delete_video(tutor_id, video_id):
     if not video:
         return jsonify({"error": "Video not found"}), 404
 
-    file_path = os.path.join(Config.UPLOAD_FOLDER, "videos", video.url)
-    if os.path.exists(file_path):
-        os.remove(file_path)
-
-    db.session.delete(video)
-    db.session.commit()
+    remove_upload(video, Config.VIDEO_FOLDER)
     return jsonify({"message": "Video deleted successfully"}), 200
 
 
@@ -258,24 +436,26 @@ def upload_paper(tutor_id):
     title = request.form.get("title")
     uploader = request.form.get("uploader", "Tutor")
     description = request.form.get("description")
+    subject = request.form.get("subject")
     file = request.files.get("file")
 
     if not file or not title:
         return jsonify({"error": "Title and file are required"}), 400
 
-    filename = file.filename
-    save_path = os.path.join(Config.UPLOAD_FOLDER, "papers", filename)
-    file.save(save_path)
+    key, _ = blob_store.put_stream(file.stream)
+    filename = blob_store.public_name(key, file.filename)
 
     paper = TutorPaper(
         tutor_id=tutor_id,
         title=title,
         uploader=uploader,
         description=description,
+        subject=subject,
         url=filename,
+        blob_key=key,
+        filename=file.filename,
     )
-    db.session.add(paper)
-    db.session.commit()
+    save_upload(paper)
 
     return jsonify({"message": "Paper uploaded successfully", "file": filename}), 200
 
@@ -289,7 +469,9 @@ def get_papers(tutor_id):
             "title": p.title,
             "uploader": p.uploader,
             "description": p.description,
-            "url": p.url
+            "subject": p.subject,
+            "url": p.url,
+            "filename": p.filename or p.url
         } for p in papers
     ])
 
@@ -300,42 +482,214 @@ def delete_paper(tutor_id, paper_id):
     if not paper:
         return jsonify({"error": "Paper not found"}), 404
 
-    file_path = os.path.join(Config.UPLOAD_FOLDER, "papers", paper.url)
-    if os.path.exists(file_path):
-        os.remove(file_path)
-
-    db.session.delete(paper)
-    db.session.commit()
+    remove_upload(paper, Config.PAPER_FOLDER)
     return jsonify({"message": "Paper deleted successfully"}), 200
 
 
+# ---------------------- CHUNKED UPLOADS ----------------------
+# Resumable alternative to the multipart endpoints above:
+#   POST   /<tutor_id>/uploads                        {kind, filename, size, title, subject, ...}
+#   PUT    /<tutor_id>/uploads/<upload_id>?offset=N   raw bytes of the next chunk
+#   GET    /<tutor_id>/uploads/<upload_id>            offset to resume from
+#   POST   /<tutor_id>/uploads/<upload_id>/finalize   creates the video/paper
+#   DELETE /<tutor_id>/uploads/<upload_id>            abandon the upload
+
+chunked_uploads = ChunkedUploads(Config.PARTIAL_FOLDER)
+
+UPLOAD_KINDS = {"video": TutorVideo, "paper": TutorPaper}
+
+
+@tutors_bp.errorhandler(UploadError)
+def upload_error(e):
+    body = {"error": str(e)}
+    if e.offset is not None:
+        body["offset"] = e.offset
+    return jsonify(body), e.status
+
+
+def tutor_upload(tutor_id, upload_id):
+    """Metadata of an upload, 404 if it belongs to another tutor"""
+    meta = chunked_uploads.meta(upload_id)
+    if meta.get("tutor_id") != tutor_id:
+        raise UploadError("Upload not found", 404)
+    return meta
+
+
+@tutors_bp.route("/<tutor_id>/uploads", methods=["POST"])
+def init_upload(tutor_id):
+    """Start a chunked upload"""
+    data = request.get_json() or {}
+    kind = data.get("kind")
+    if kind not in UPLOAD_KINDS:
+        return jsonify({"error": "kind must be 'video' or 'paper'"}), 400
+    if not data.get("title") or not data.get("filename"):
+        return jsonify({"error": "Title and filename are required"}), 400
+
+    status = chunked_uploads.create({
+        "tutor_id": tutor_id,
+        "kind": kind,
+        "filename": data["filename"],
+        "size": data.get("size"),
+        "sha256": data.get("sha256"),
+        "title": data["title"],
+        "uploader": data.get("uploader", "Tutor"),
+        "description": data.get("description"),
+        "subject": data.get("subject"),
+    })
+    return jsonify(status), 201
+
+
+@tutors_bp.route("/<tutor_id>/uploads/<upload_id>", methods=["GET"])
+def upload_status(tutor_id, upload_id):
+    tutor_upload(tutor_id, upload_id)
+    return jsonify(chunked_uploads.status(upload_id))
+
+
+@tutors_bp.route("/<tutor_id>/uploads/<upload_id>", methods=["PUT"])
+def upload_chunk(tutor_id, upload_id):
+    """Append a chunk; ?offset= (or Upload-Offset) must be the current offset"""
+    tutor_upload(tutor_id, upload_id)
+    offset = request.args.get("offset", request.headers.get("Upload-Offset"))
+    try:
+        offset = int(offset)
+    except (TypeError, ValueError):
+        return jsonify({"error": "offset is required"}), 400
+
+    offset = chunked_uploads.write_chunk(upload_id, offset, request.stream, request.content_length)
+    return jsonify({"upload_id": upload_id, "offset": offset})
+
+
+@tutors_bp.route("/<tutor_id>/uploads/<upload_id>/finalize", methods=["POST"])
+def finalize_upload(tutor_id, upload_id):
+    """Move a complete upload into place and create its video/paper row"""
+    tutor_upload(tutor_id, upload_id)
+    with chunked_uploads.finish(upload_id) as (part_path, meta, digest):
+        # the chunks were hashed on the way in, so the blob key is already known
+        blob_store.add_file(part_path, digest, meta["size"])
+    filename = blob_store.public_name(digest, meta["filename"])
+
+    item = UPLOAD_KINDS[meta["kind"]](
+        tutor_id=tutor_id,
+        title=meta["title"],
+        uploader=meta["uploader"],
+        description=meta.get("description"),
+        subject=meta.get("subject"),
+        url=filename,
+        blob_key=digest,
+        filename=meta["filename"],
+    )
+    save_upload(item)
+    if meta["kind"] == "video":
+        transcoder.enqueue(item)
+
+    return jsonify({
+        "message": f"{meta['kind'].capitalize()} uploaded successfully",
+        "id": item.id,
+        "file": filename,
+        "sha256": digest,
+    }), 201
+
+
+@tutors_bp.route("/<tutor_id>/uploads/<upload_id>", methods=["DELETE"])
+def abort_upload(tutor_id, upload_id):
+    tutor_upload(tutor_id, upload_id)
+    chunked_uploads.discard(upload_id)
+    return jsonify({"message": "Upload cancelled"}), 200
+
+
+def start_upload_cleanup():
+    """Remove partial uploads that were abandoned"""
+    max_age = Config.UPLOAD_EXPIRY_HOURS * 3600
+    return run_periodically(3600, lambda: chunked_uploads.purge_stale(max_age), name="upload-cleanup")
+
+
 # ---------------------- SERVE FILES ----------------------
 
 @tutors_bp.route("/uploads/videos/<filename>")
 def serve_video(filename):
-    return send_from_directory(os.path.join(Config.UPLOAD_FOLDER, "videos"), filename)
+    return serve_upload(Config.VIDEO_FOLDER, filename)
 
 
 @tutors_bp.route("/uploads/papers/<filename>")
 def serve_paper(filename):
-    return send_from_directory(os.path.join(Config.UPLOAD_FOLDER, "papers"), filename)
+    return serve_upload(Config.PAPER_FOLDER, filename)
+
+
+@tutors_bp.route("/uploads/hls/<path:name>")
+def serve_hls(name):
+    """HLS playlists, segments and posters written by the transcoder"""
+    return send_upload(Config.HLS_FOLDER, name)
+
+
+def serve_upload(folder, filename):
+    """<key>.<ext> names come from the blob store, anything else from `folder`"""
+    key = blob_store.key_from_name(filename)
+    if key:
+        return send_upload(blob_store.folder, os.path.join(key[:2], key), name=filename)
+    return send_upload(folder, filename)
+
+def catalog_item(item):
+    return {
+        "id": item.id,
+        "title": item.title,
+        "uploader": item.uploader,
+        "description": item.description,
+        "url": item.url,
+        "filename": item.filename or item.url,
+        "duration": getattr(item, "duration", None),
+        "hls": getattr(item, "hls", None),
+        "poster": getattr(item, "poster", None),
+        "uploadedAt": item.created_at.isoformat() if item.created_at else None,
+        "subject": item.subject
+    }
+
+def catalog_page(model, limit, cursor):
+    """
+    Newest-first keyset page over (created_at, id), served by the composite
+    index on those columns; rows without a created_at come last, by id.
+    Returns (rows, next cursor or None); without a limit, rows is an
+    iterator over both queries, fetched from the cursor in batches.
+    """
+    dated = model.query.filter(model.created_at.isnot(None)).order_by(model.created_at.desc(), model.id.desc())
+    undated = model.query.filter(model.created_at.is_(None)).order_by(model.id.desc())
+    if cursor and cursor[0] is None:
+        # already in the undated tail
+        dated, undated = None, undated.filter(model.id < int(cursor[1]))
+    elif cursor:
+        created_at, last_id = datetime.fromisoformat(cursor[0]), int(cursor[1])
+        dated = dated.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < last_id),
+        ))
+    if limit is None:
+        return chain(dated.yield_per(500) if dated is not None else (), undated.yield_per(500)), None
+
+    rows = dated.limit(limit + 1).all() if dated is not None else []
+    if len(rows) <= limit:
+        rows += undated.limit(limit + 1 - len(rows)).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor([last.created_at.isoformat() if last.created_at else None, last.id])
+
+def catalog_response(model, key):
+    try:
+        limit, cursor, fields = page_args()
+        rows, next_cursor = catalog_page(model, limit, cursor)
+    except (PaginationError, ValueError, TypeError, IndexError):
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    if limit is None:
+        # full export: stream straight off the DB cursor
+        return stream_json((project(catalog_item(r), fields) for r in rows), key=key)
+    return jsonify({key: [project(catalog_item(r), fields) for r in rows], "nextCursor": next_cursor})
 
 #students getting videos and papers
+# ?limit=&cursor= for keyset paging, ?fields=id,title,... to trim each item
 @tutors_bp.route("/all/videos", methods=["GET"])
+@conditional(lambda: dataset_version(TutorVideo.__tablename__))
 def get_all_videos():
-    videos = TutorVideo.query.order_by(TutorVideo.created_at.desc()).all()
-    video_list = []
-    for v in videos:
-        video_list.append({
-            "id": v.id,
-            "title": v.title,
-            "uploader": v.uploader,
-            "description": v.description,
-            "url": v.url,
-            "uploadedAt": v.created_at.isoformat(),
-            "subject": getattr(v, "subject", None)  # optional field
-        })
-    return jsonify({"videos": video_list})
+    return catalog_response(TutorVideo, "videos")
 
 
 # =========================
@@ -343,17 +697,6 @@ def get_all_videos():
 # GET /api/tutors/all/papers
 # =========================
 @tutors_bp.route("/all/papers", methods=["GET"])
+@conditional(lambda: dataset_version(TutorPaper.__tablename__))
 def get_all_papers():
-    papers = TutorPaper.query.order_by(TutorPaper.created_at.desc()).all()
-    paper_list = []
-    for p in papers:
-        paper_list.append({
-            "id": p.id,
-            "title": p.title,
-            "uploader": p.uploader,
-            "description": p.description,
-            "url": p.url,
-            "uploadedAt": p.created_at.isoformat(),
-            "subject": getattr(p, "subject", None)  # optional field
-        })
-    return jsonify({"papers": paper_list})
+    return catalog_response(TutorPaper, "papers")
@@ -0,0 +1,140 @@
+import re
+
+from sqlalchemy import event, inspect, text
+
+from .models import db, TutorVideo, TutorPaper
+
+# ---------------------- Catalog full-text index ----------------------
+# One SQLite FTS5 table over videos and papers. Entries are keyed by
+# rowid = id * 2 + kind code, so a row's entry is replaced or dropped by
+# rowid instead of a scan. The mapper events below keep it in step with the
+# tables inside the same transaction as the row itself.
+
+KINDS = {"video": (TutorVideo, 0), "paper": (TutorPaper, 1)}
+CODES = {model: code for model, code in KINDS.values()}
+COLUMNS = ("title", "description", "uploader", "subject")
+# bm25() weights, in COLUMNS order: a title hit counts most
+WEIGHTS = (10.0, 1.0, 3.0, 5.0)
+DEFAULT_LIMIT = 20
+
+_TERM = re.compile(r"\w+")
+_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5("
+    "title, description, uploader, subject, "
+    # prefix indexes make 2- and 3-letter prefix queries index lookups too
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+
+def _fill(connection):
+    for model, code in KINDS.values():
+        connection.execute(text(
+            f"INSERT INTO catalog_fts (rowid, {', '.join(COLUMNS)}) "
+            f"SELECT id * 2 + {code}, {', '.join(COLUMNS)} FROM {model.__tablename__}"
+        ))
+
+
+def ensure_search_index():
+    """Create the index, filling it from the tables if it is empty. Needs an app context."""
+    with db.engine.begin() as connection:
+        connection.execute(text(_CREATE))
+        if connection.execute(text("SELECT rowid FROM catalog_fts LIMIT 1")).first() is None:
+            _fill(connection)
+
+
+def rebuild_search_index():
+    """Re-index every video and paper from scratch."""
+    with db.engine.begin() as connection:
+        connection.execute(text(_CREATE))
+        connection.execute(text("DELETE FROM catalog_fts"))
+        _fill(connection)
+
+
+# ---------------------- Maintenance ----------------------
+def _rowid(target):
+    return target.id * 2 + CODES[type(target)]
+
+
+def _index(connection, target):
+    rowid = _rowid(target)
+    connection.execute(text("DELETE FROM catalog_fts WHERE rowid = :rowid"), {"rowid": rowid})
+    connection.execute(
+        text(f"INSERT INTO catalog_fts (rowid, {', '.join(COLUMNS)}) "
+             f"VALUES (:rowid, {', '.join(':' + c for c in COLUMNS)})"),
+        {"rowid": rowid, **{c: getattr(target, c) for c in COLUMNS}},
+    )
+
+
+@event.listens_for(TutorVideo, "after_insert")
+@event.listens_for(TutorPaper, "after_insert")
+def _index_new(mapper, connection, target):
+    _index(connection, target)
+
+
+@event.listens_for(TutorVideo, "after_update")
+@event.listens_for(TutorPaper, "after_update")
+def _index_changed(mapper, connection, target):
+    # transcoder status updates and the like leave the index alone
+    state = inspect(target)
+    if any(state.attrs[c].history.has_changes() for c in COLUMNS):
+        _index(connection, target)
+
+
+@event.listens_for(TutorVideo, "after_delete")
+@event.listens_for(TutorPaper, "after_delete")
+def _unindex_row(mapper, connection, target):
+    connection.execute(text("DELETE FROM catalog_fts WHERE rowid = :rowid"), {"rowid": _rowid(target)})
+
+
+# ---------------------- Querying ----------------------
+def match_expression(q, **columns):
+    """
+    FTS5 query for free text `q`: every word must match, as a prefix ("alg"
+    finds "algebra"), in any column. `columns` (e.g. subject="maths") add
+    phrases that must appear in that column. Words are re-quoted, so user
+    input never reaches the FTS5 query syntax. Empty string if nothing to match.
+    """
+    terms = [f'"{word}"*' for word in _TERM.findall(q or "")]
+    for column, value in columns.items():
+        words = _TERM.findall(value or "")
+        if words:
+            terms.append(f'{column} : "{" ".join(words)}"')
+    return " ".join(terms)
+
+
+def search(match, kind=None, limit=DEFAULT_LIMIT, after=None):
+    """
+    Best bm25 matches of `match` first, as (kind, id, score) tuples. Pages
+    are keyset: `after` is the (score, rowid) of the last hit already seen.
+    Returns (hits, (score, rowid) of the last hit or None if there are no more).
+    """
+    weights = ", ".join(str(w) for w in WEIGHTS)
+    sql = (
+        f"SELECT rowid, bm25(catalog_fts, {weights}) AS score FROM catalog_fts "
+        f"WHERE catalog_fts MATCH :match"
+    )
+    params = {"match": match, "limit": limit + 1}
+    if kind is not None:
+        sql += " AND rowid % 2 = :code"
+        params["code"] = KINDS[kind][1]
+    sql = f"SELECT rowid, score FROM ({sql})"
+    if after is not None:
+        sql += " WHERE score > :score OR (score = :score AND rowid > :rowid)"
+        params["score"], params["rowid"] = after
+    sql += " ORDER BY score, rowid LIMIT :limit"
+
+    rows = db.session.execute(text(sql), params).all()
+    kind_of = {code: name for name, (_, code) in KINDS.items()}
+    hits = [(kind_of[rowid % 2], rowid // 2, score) for rowid, score in rows[:limit]]
+    last = (rows[limit - 1].score, rows[limit - 1].rowid) if len(rows) > limit else None
+    return hits, last
+
+
+def load_hits(hits):
+    """The rows behind `hits`, in hit order, one query per kind."""
+    found = {}
+    for name, (model, _) in KINDS.items():
+        ids = [item_id for kind, item_id, _ in hits if kind == name]
+        if ids:
+            found.update(((name, row.id), row) for row in model.query.filter(model.id.in_(ids)))
+    return [(kind, found[(kind, item_id)]) for kind, item_id, _ in hits if (kind, item_id) in found]
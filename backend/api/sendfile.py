@@ -0,0 +1,97 @@
+import mimetypes
+import os
+import stat
+from zlib import adler32
+
+from flask import abort, current_app, request, send_file
+from werkzeug.security import safe_join
+
+from .config import Config
+
+
+def _etag(path, st):
+    return f"{st.st_mtime}-{st.st_size}-{adler32(path.encode()) & 0xFFFFFFFF}"
+
+
+def _mimetype(path):
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _offload(path, st, mimetype):
+    """Empty response telling the fronting proxy to send the file itself."""
+    response = current_app.response_class(mimetype=mimetype)
+    if Config.SENDFILE_MODE == "x-accel":
+        relative = os.path.relpath(path, Config.UPLOAD_FOLDER).replace(os.sep, "/")
+        response.headers["X-Accel-Redirect"] = f"{Config.SENDFILE_PREFIX.rstrip('/')}/{relative}"
+    else:
+        response.headers["X-Sendfile"] = path
+    response.accept_ranges = "bytes"
+    response.last_modified = st.st_mtime
+    response.set_etag(_etag(path, st))
+    return response
+
+
+def _ranged(path, st, mimetype):
+    """
+    206 for a single byte range as a seeked file handed to the server's
+    wsgi.file_wrapper: gunicorn sends Content-Length bytes from the current
+    offset with sendfile(2), so the range never passes through Python.
+    None when the range can't be served this way (werkzeug handles it).
+    """
+    byte_range = request.range
+    if byte_range is None or "If-Range" in request.headers or len(byte_range.ranges) != 1:
+        return None
+    bounds = byte_range.range_for_length(st.st_size)
+    if bounds is None:
+        return None
+    start, stop = bounds
+
+    f = open(path, "rb")
+    try:
+        f.seek(start)
+        body = request.environ["wsgi.file_wrapper"](f, 64 * 1024)
+        response = current_app.response_class(body, 206, mimetype=mimetype, direct_passthrough=True)
+        response.content_length = stop - start
+        response.content_range = f"bytes {start}-{stop - 1}/{st.st_size}"
+        response.accept_ranges = "bytes"
+        response.last_modified = st.st_mtime
+        response.set_etag(_etag(path, st))
+        response.cache_control.no_cache = True
+    except BaseException:
+        f.close()  # never reached the server, so nothing else would close it
+        raise
+    return response
+
+
+def send_upload(folder, filename, name=None):
+    """
+    Serve an uploaded file with Range / 206 support. `name` (default: the
+    file's own) sets the Content-Type and the filename clients see.
+
+    SENDFILE_MODE "x-accel" or "x-sendfile" hands the transfer to nginx or
+    Apache/lighttpd. Otherwise the file goes out through wsgi.file_wrapper,
+    which gunicorn turns into sendfile(2) for whole files and, via _ranged(),
+    for single ranges too; other servers get werkzeug's range handling.
+    """
+    path = safe_join(folder, filename)
+    if path is None:
+        abort(404)
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        abort(404)
+    if not stat.S_ISREG(st.st_mode):
+        abort(404)
+
+    mimetype = _mimetype(name or filename)
+
+    if Config.SENDFILE_MODE in ("x-accel", "x-sendfile"):
+        return _offload(path, st, mimetype)
+
+    if request.environ.get("SERVER_SOFTWARE", "").startswith("gunicorn") and "wsgi.file_wrapper" in request.environ:
+        response = _ranged(path, st, mimetype)
+        if response is not None:
+            return response
+
+    return send_file(path, mimetype=mimetype, download_name=os.path.basename(name or filename),
+                     conditional=True, etag=_etag(path, st))
@@ -0,0 +1,79 @@
+from .fileio import FileLock
+from .models import db, bump_dataset_version, dataset_version
+
+
+class SqlStore:
+    """
+    Same interface as JsonStore, backed by a RecordMixin table. Lookups are
+    indexed queries and writes touch a single row, so neither grows with the
+    size of the dataset. Needs an app context, like any other query.
+    """
+
+    def __init__(self, model, name=None, lock_path=None):
+        self.model = model
+        self.name = name or model.__tablename__
+        # same lock file the JSON store would use, for check-then-write callers
+        self.write_lock = FileLock(lock_path or self.name)
+
+    def _column(self, field):
+        return getattr(self.model, self.model.FIELDS[field])
+
+    def _query(self, field, value):
+        return self.model.query.filter(self._column(field) == value)
+
+    def bump_version(self):
+        bump_dataset_version(db.session.connection(), self.name)
+
+    # ---------------------- Reads ----------------------
+    @property
+    def version(self):
+        return dataset_version(self.name)
+
+    def all(self):
+        return [row.to_dict() for row in self.model.query.all()]
+
+    def iter_all(self, batch_size=500):
+        """Rows fetched from the cursor `batch_size` at a time."""
+        return (row.to_dict() for row in self.model.query.yield_per(batch_size))
+
+    def get(self, field, value):
+        if value is None:
+            return None
+        if field == "id":
+            row = db.session.get(self.model, value)
+        else:
+            row = self._query(field, value).first()
+        return row.to_dict() if row else None
+
+    def filter(self, field, value):
+        return [row.to_dict() for row in self._query(field, value).all()]
+
+    # ---------------------- Writes ----------------------
+    def insert(self, record):
+        db.session.add(self.model().update_from(record))
+        self.bump_version()
+        db.session.commit()
+        return record
+
+    def update(self, field, value, changes):
+        row = self._query(field, value).first()
+        if row is None:
+            return None
+        row.update_from(changes)
+        self.bump_version()
+        db.session.commit()
+        return row.to_dict()
+
+    def delete(self, field, value):
+        deleted = self._query(field, value).delete()
+        if deleted:
+            self.bump_version()
+        db.session.commit()
+        return bool(deleted)
+
+    def save(self, records):
+        """Replace the whole table with `records`."""
+        self.model.query.delete()
+        db.session.add_all(self.model().update_from(r) for r in records)
+        self.bump_version()
+        db.session.commit()
@@ -0,0 +1,162 @@
+import json
+import os
+import threading
+
+from .config import Config
+from .fileio import FileLock, atomic_write_json
+
+_UNLOADED = object()
+
+
+class JsonStore:
+    """
+    Keeps a JSON list file parsed in memory, with dict indexes on some fields.
+
+    The file is only re-read when its inode, size or mtime changes (another
+    worker wrote it) or after a local save, so lookups never touch the disk.
+    Writes hold a cross-process file lock, re-read the latest contents and
+    replace the file atomically, so concurrent workers never lose records.
+    Callers doing check-then-write can hold `write_lock()` around both.
+    Records handed out are shared with the cache: copy before mutating unless
+    the result is saved straight back.
+
+    `normalize` converts an older on-disk layout (anything that is not a list)
+    into a list of records.
+    """
+
+    def __init__(self, path, indexes=(), indent=4, normalize=None):
+        self.path = path
+        self.index_fields = tuple(indexes)
+        self.indent = indent
+        self.normalize = normalize
+        self._lock = threading.RLock()
+        self.write_lock = FileLock(path)
+        self._signature = _UNLOADED
+        self._records = []
+        self._indexes = {}
+
+    # ---------------------- Internals ----------------------
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                data = f.read().strip()
+        except FileNotFoundError:
+            return []
+        if not data:
+            return []
+        try:
+            records = json.loads(data)
+        except json.JSONDecodeError:
+            return []
+        if not isinstance(records, list):
+            records = self.normalize(records) if self.normalize else []
+        return records
+
+    def _build(self, records, signature):
+        indexes = {field: {} for field in self.index_fields}
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            for field, index in indexes.items():
+                value = record.get(field)
+                if value is None:
+                    continue
+                try:
+                    index.setdefault(value, []).append(record)
+                except TypeError:
+                    continue  # unhashable value, cannot be looked up anyway
+        self._records = records
+        self._indexes = indexes
+        self._signature = signature
+
+    def _refresh(self):
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        with self._lock:
+            signature = self._stat()
+            if signature != self._signature:
+                self._build(self._read(), signature)
+
+    # ---------------------- Public API ----------------------
+    @property
+    def version(self):
+        """Opaque token that changes whenever the file contents change."""
+        self._refresh()
+        return self._signature
+
+    def all(self):
+        """Return a new list of all records (the records themselves are shared)."""
+        self._refresh()
+        return list(self._records)
+
+    def iter_all(self):
+        return iter(self.all())
+
+    def get(self, field, value):
+        """Return the first record whose `field` equals `value`, or None."""
+        self._refresh()
+        try:
+            matches = self._indexes[field].get(value)
+        except TypeError:
+            return None
+        return matches[0] if matches else None
+
+    def filter(self, field, value):
+        """Return every record whose `field` equals `value`."""
+        self._refresh()
+        try:
+            return list(self._indexes[field].get(value, []))
+        except TypeError:
+            return []
+
+    def insert(self, record):
+        with self.write_lock():
+            self.save(self.all() + [record])
+        return record
+
+    def update(self, field, value, changes):
+        """Merge `changes` into the first record matching `field` == `value`."""
+        with self.write_lock():
+            records = self.all()
+            for i, record in enumerate(records):
+                if record.get(field) == value:
+                    records[i] = {**record, **changes}
+                    self.save(records)
+                    return records[i]
+        return None
+
+    def delete(self, field, value):
+        """Remove every record matching `field` == `value`."""
+        with self.write_lock():
+            records = self.all()
+            kept = [r for r in records if r.get(field) != value]
+            if len(kept) == len(records):
+                return False
+            self.save(kept)
+        return True
+
+    def save(self, records):
+        """Replace the file contents and the cached copy with `records`."""
+        records = list(records)
+        with self.write_lock(), self._lock:
+            atomic_write_json(self.path, records, indent=self.indent)
+            self._build(records, self._stat())
+
+
+def open_store(path, model, indexes=(), indent=4, normalize=None):
+    """
+    The store for one dataset: a JsonStore over `path`, or the model's table
+    once the data has been imported and STORAGE_BACKEND is set to "sql".
+    """
+    if Config.STORAGE_BACKEND == "sql":
+        from .sqlstore import SqlStore
+        return SqlStore(model, lock_path=path)
+    return JsonStore(path, indexes=indexes, indent=indent, normalize=normalize)
@@ -0,0 +1,24 @@
+import threading
+
+
+def run_periodically(interval, func, name=None, app=None):
+    """
+    Call `func` every `interval` seconds on a daemon thread, inside an app
+    context when `app` is given (for DB access). Errors are printed and the
+    loop keeps going. Returns an Event that stops it.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                if app is None:
+                    func()
+                else:
+                    with app.app_context():
+                        func()
+            except Exception as e:
+                print(f"Background task {name or func.__name__} failed:", e)
+
+    threading.Thread(target=loop, name=name or func.__name__, daemon=True).start()
+    return stop
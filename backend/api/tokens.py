@@ -0,0 +1,125 @@
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import g, jsonify, request
+
+from .config import Config
+from .models import db, AuthToken, purge_expired
+from .tasks import run_periodically
+
+
+class TTLCache:
+    """LRU dict whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, (_, expires) in self._data.items() if expires <= now]:
+                del self._data[key]
+
+
+# token hash -> (user_id, expires_at); a hit is the whole cost of an auth check
+_cache = TTLCache(Config.TOKEN_CACHE_SIZE, Config.TOKEN_CACHE_TTL)
+
+
+def token_hash(token):
+    """SHA-256 of a login token: all the server keeps, so a leaked table holds no usable tokens."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_token(user_id):
+    token = secrets.token_urlsafe(32)
+    expires_at = datetime.utcnow() + timedelta(hours=Config.AUTH_TOKEN_HOURS)
+    key = token_hash(token)
+    db.session.add(AuthToken(token=key, user_id=user_id, expires_at=expires_at))
+    db.session.commit()
+    _cache.set(key, (user_id, expires_at))
+    return token
+
+
+def validate_token(token):
+    """user id for a live token, else None. Only cache misses reach the DB."""
+    if not token:
+        return None
+    key = token_hash(token)
+    entry = _cache.get(key)
+    if entry is None:
+        row = db.session.get(AuthToken, key)
+        if row is None:
+            return None
+        entry = (row.user_id, row.expires_at)
+        remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+        if remaining > 0:
+            _cache.set(key, entry, ttl=remaining)
+    user_id, expires_at = entry
+    return user_id if expires_at > datetime.utcnow() else None
+
+
+def revoke_token(token):
+    if not token:
+        return
+    key = token_hash(token)
+    _cache.pop(key)
+    AuthToken.query.filter_by(token=key).delete()
+    db.session.commit()
+
+
+def sweep_expired_tokens():
+    _cache.purge_expired()
+    return purge_expired(AuthToken)
+
+
+def start_token_sweeper(app):
+    return run_periodically(Config.TOKEN_SWEEP_INTERVAL, sweep_expired_tokens, name="token-sweep", app=app)
+
+
+def bearer_token():
+    header = request.headers.get("Authorization", "")
+    return header[7:].strip() if header.startswith("Bearer ") else None
+
+
+def require_auth(view):
+    """Reject requests without a valid `Authorization: Bearer <token>`; sets g.user_id."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = validate_token(bearer_token())
+        if user_id is None:
+            return jsonify({"error": "Authentication required"}), 401
+        g.user_id = user_id
+        return view(*args, **kwargs)
+    return wrapper
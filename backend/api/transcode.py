@@ -0,0 +1,255 @@
+import json
+import mimetypes
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from .config import Config
+from .models import db, TutorVideo
+from .tasks import run_periodically
+
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+
+MASTER_PLAYLIST = "master.m3u8"
+POSTER = "poster.jpg"
+INFO = "info.json"
+
+
+# ---------------------- ffmpeg ----------------------
+def ffmpeg_exe():
+    """The ffmpeg binary bundled with imageio-ffmpeg (moviepy's dependency), else PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return shutil.which("ffmpeg") or "ffmpeg"
+
+
+def run_ffmpeg(args, timeout, **kwargs):
+    """subprocess.run with output captured; a run past `timeout` seconds is killed and raises RuntimeError."""
+    try:
+        return subprocess.run(args, capture_output=True, timeout=timeout, **kwargs)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"ffmpeg timed out after {timeout} seconds")
+
+
+def probe(ffmpeg, src):
+    """Duration (seconds), video height and whether there is audio, from ffmpeg's banner."""
+    out = run_ffmpeg([ffmpeg, "-hide_banner", "-i", src], Config.TRANSCODE_PROBE_TIMEOUT, text=True).stderr
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", out)
+    if not duration:
+        raise RuntimeError("Not a readable video file")
+    hours, minutes, seconds = duration.groups()
+    size = re.search(r"Stream #.*Video:.*?(\d{2,5})x(\d{2,5})", out)
+    return {
+        "duration": int(hours) * 3600 + int(minutes) * 60 + float(seconds),
+        "height": int(size.group(2)) if size else None,
+        "audio": re.search(r"Stream #.*Audio:", out) is not None,
+    }
+
+
+def transcode(src, out_dir):
+    """
+    Write HLS renditions (one ffmpeg pass, one decode), a poster frame and
+    info.json for `src` into `out_dir`. Built in a temporary sibling
+    directory and renamed into place, so a half-finished job is never served.
+    """
+    ffmpeg = ffmpeg_exe()
+    info = probe(ffmpeg, src)
+    renditions = [r for r in Config.TRANSCODE_RENDITIONS if not info["height"] or r[0] <= info["height"]]
+    renditions = renditions or Config.TRANSCODE_RENDITIONS[:1]
+
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(out_dir), prefix=os.path.basename(out_dir) + ".")
+    os.chmod(tmp_dir, 0o755)
+    try:
+        run_ffmpeg([
+            ffmpeg, "-y", "-loglevel", "error", "-ss", str(min(1.0, info["duration"] / 2)), "-i", src,
+            "-frames:v", "1", "-vf", "scale=-2:360", os.path.join(tmp_dir, POSTER),
+        ], Config.TRANSCODE_PROBE_TIMEOUT, check=True)
+
+        splits = "".join(f"[v{i}]" for i in range(len(renditions)))
+        filters = [f"[0:v]split={len(renditions)}{splits}"]
+        args = [ffmpeg, "-y", "-loglevel", "error", "-i", src]
+        stream_map = []
+        for i, (height, kbps) in enumerate(renditions):
+            filters.append(f"[v{i}]scale=-2:{height}[out{i}]")
+            args += ["-map", f"[out{i}]", f"-c:v:{i}", "libx264", "-preset", "veryfast",
+                     f"-b:v:{i}", f"{kbps}k", f"-maxrate:v:{i}", f"{kbps * 107 // 100}k",
+                     f"-bufsize:v:{i}", f"{kbps * 2}k"]
+            if info["audio"]:
+                args += ["-map", "0:a:0"]
+                stream_map.append(f"v:{i},a:{i},name:{height}p")
+            else:
+                stream_map.append(f"v:{i},name:{height}p")
+        if info["audio"]:
+            args += ["-c:a", "aac", "-b:a", f"{Config.TRANSCODE_AUDIO_KBPS}k", "-ac", "2"]
+        args += [
+            "-filter_complex", ";".join(filters),
+            # phones record yuv444/10-bit at times; browsers only play 4:2:0 H.264
+            "-pix_fmt", "yuv420p",
+            # keyframes on segment boundaries so every rendition switches cleanly
+            "-g", "48", "-keyint_min", "48", "-sc_threshold", "0",
+            "-f", "hls", "-hls_time", str(Config.HLS_SEGMENT_SECONDS), "-hls_playlist_type", "vod",
+            "-hls_segment_filename", os.path.join(tmp_dir, "%v", "seg_%03d.ts"),
+            "-master_pl_name", MASTER_PLAYLIST,
+            "-var_stream_map", " ".join(stream_map),
+            os.path.join(tmp_dir, "%v", "index.m3u8"),
+        ]
+        result = run_ffmpeg(args, Config.TRANSCODE_ENCODE_TIMEOUT, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "ffmpeg failed")
+
+        info = {"duration": round(info["duration"], 2), "renditions": [f"{h}p" for h, _ in renditions]}
+        with open(os.path.join(tmp_dir, INFO), "w") as f:
+            json.dump(info, f)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return info
+
+
+# ---------------------- Job queue (runs in the app) ----------------------
+class Transcoder:
+    """
+    Transcoding jobs for TutorVideo rows. Each job runs ffmpeg as a child
+    process, at most TRANSCODE_WORKERS at once; the pool threads only wait
+    on them, so request workers are never blocked.
+
+    The queue is the transcode_status column: uploads mark a video
+    "pending", and dispatch() claims pending rows (in one UPDATE, so several
+    app workers never take the same video) as the pool has room. Rows left
+    "processing" longer than TRANSCODE_TIMEOUT, e.g. by a worker that died,
+    are claimed again. Output lives in HLS_FOLDER/<blob key>, so videos
+    sharing a blob share their renditions.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._pool = None
+        self._jobs = {}  # output dir -> ids of the videos waiting on it
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        os.makedirs(Config.HLS_FOLDER, exist_ok=True)
+        return run_periodically(Config.TRANSCODE_INTERVAL, self.dispatch, name="transcode-dispatch", app=app)
+
+    @staticmethod
+    def output_name(video):
+        return video.blob_key or f"video-{video.id}"
+
+    def output_dir(self, video):
+        return os.path.join(Config.HLS_FOLDER, self.output_name(video))
+
+    def remove_output(self, name):
+        shutil.rmtree(os.path.join(Config.HLS_FOLDER, name), ignore_errors=True)
+
+    # ---------------------- Claiming ----------------------
+    def _claim(self, limit):
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=Config.TRANSCODE_TIMEOUT)
+        due = (
+            db.session.query(TutorVideo.id)
+            .filter(db.or_(
+                TutorVideo.transcode_status == "pending",
+                db.and_(TutorVideo.transcode_status == "processing", TutorVideo.transcode_started_at < stale),
+            ))
+            .order_by(TutorVideo.id)
+            .limit(limit)
+        )
+        TutorVideo.query.filter(TutorVideo.id.in_(due.scalar_subquery())).update(
+            {"transcode_status": "processing", "transcode_started_at": now}, synchronize_session=False
+        )
+        db.session.commit()
+        return TutorVideo.query.filter_by(transcode_status="processing", transcode_started_at=now).all()
+
+    def dispatch(self):
+        """Start jobs for pending videos while the pool has free workers. Needs an app context."""
+        started = []
+        with self._lock:
+            free = Config.TRANSCODE_WORKERS - len(self._jobs)
+            if free <= 0:
+                return 0
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=Config.TRANSCODE_WORKERS,
+                                                thread_name_prefix="transcode")
+            videos = self._claim(free)
+            for video in videos:
+                out_dir = self.output_dir(video)
+                if out_dir in self._jobs:
+                    # same blob is being transcoded for another video right now
+                    self._jobs[out_dir].append(video.id)
+                    continue
+                if os.path.exists(os.path.join(out_dir, INFO)):
+                    # same content was already transcoded for another video
+                    with open(os.path.join(out_dir, INFO)) as f:
+                        self._finish(video.id, info=json.load(f))
+                    continue
+                try:
+                    future = self._pool.submit(transcode, self.source_path(video), out_dir)
+                except RuntimeError as e:
+                    self._finish(video.id, error=str(e))
+                    continue
+                self._jobs[out_dir] = [video.id]
+                started.append((out_dir, future))
+        # outside the lock: a job that already finished runs its callback here
+        for out_dir, future in started:
+            future.add_done_callback(lambda fut, out_dir=out_dir: self._done(out_dir, fut))
+        return len(videos)
+
+    @staticmethod
+    def source_path(video):
+        if video.blob_key:
+            from .blobs import blob_store
+            return blob_store.path(video.blob_key)
+        return os.path.join(Config.VIDEO_FOLDER, video.url)
+
+    # ---------------------- Completion ----------------------
+    def _done(self, out_dir, future):
+        with self._lock:
+            video_ids = self._jobs.pop(out_dir, [])
+        with self.app.app_context():
+            try:
+                info = future.result()
+            except Exception as e:
+                print(f"Transcoding videos {video_ids} failed:", e)
+                for video_id in video_ids:
+                    self._finish(video_id, error=str(e) or e.__class__.__name__)
+            else:
+                for video_id in video_ids:
+                    self._finish(video_id, info=info)
+            self.dispatch()
+
+    def _finish(self, video_id, info=None, error=None):
+        video = db.session.get(TutorVideo, video_id)
+        if video is None:
+            return  # deleted while it was being transcoded
+        if error:
+            video.transcode_status = "failed"
+            video.transcode_error = error[:500]
+        else:
+            name = self.output_name(video)
+            video.transcode_status = "ready"
+            video.transcode_error = None
+            video.duration = info["duration"]
+            video.hls = f"{name}/{MASTER_PLAYLIST}"
+            video.poster = f"{name}/{POSTER}"
+        db.session.commit()
+
+    def enqueue(self, video):
+        """Queue a (committed) video and try to start it right away."""
+        video.transcode_status = "pending"
+        video.transcode_error = None
+        db.session.commit()
+        self.dispatch()
+
+
+transcoder = Transcoder()
@@ -0,0 +1,186 @@
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain, islice
+from operator import itemgetter
+
+from .config import Config
+
+_UNBUILT = object()
+
+
+# ---------------------- Facet keys of a tutor record ----------------------
+def subject_keys(tutor):
+    subjects = tutor.get("subjects") or []
+    if isinstance(subjects, str):
+        subjects = subjects.split(",")
+    return {s.strip().lower() for s in subjects if isinstance(s, str) and s.strip()}
+
+
+def day_keys(tutor):
+    """Availability slots ("Mon-Morning", "Monday", ...) reduced to their day: "Mon"."""
+    slots = tutor.get("availability") or []
+    if isinstance(slots, str):
+        slots = slots.split(",")
+    return {s.split("-")[0].strip()[:3].capitalize() for s in slots if isinstance(s, str) and s.strip()}
+
+
+def price_key(tutor):
+    try:
+        price = float(str(tutor.get("price")).replace(",", ""))
+    except (TypeError, ValueError):
+        return None
+    return price if math.isfinite(price) and price >= 0 else None
+
+
+def price_band(price):
+    bands = Config.TUTOR_PRICE_BANDS
+    i = max(bisect_right(bands, price) - 1, 0)
+    return f"{bands[i]}-{bands[i + 1]}" if i + 1 < len(bands) else f"{bands[i]}+"
+
+
+class TutorIndex:
+    """
+    Facet indexes over a tutors store, kept in memory: subject, day and
+    price band -> ids (inverted), plus (price, id) pairs in sorted order for
+    price ranges and price ordering. Ids are kept as strings (tutors.json mixes
+    ints and uuids).
+
+    Writes this worker makes go through apply(), which updates the indexes in
+    place. If the store's version moved some other way (another worker
+    wrote), the next read rebuilds them from the store.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.version = _UNBUILT
+        self._lock = threading.RLock()
+        self._tutors = {}  # id -> record, in store order
+        self._keys = {}  # id -> (subjects, days, price) it is indexed under
+        self.subjects = {}
+        self.days = {}
+        self.bands = {}
+        self.prices = []
+
+    # ---------------------- Maintenance ----------------------
+    def _postings(self, subjects, days, price):
+        yield self.subjects, subjects
+        yield self.days, days
+        yield self.bands, () if price is None else (price_band(price),)
+
+    def _unlink(self, tutor_id):
+        subjects, days, price = self._keys.pop(tutor_id)
+        for index, values in self._postings(subjects, days, price):
+            for key in values:
+                ids = index[key]
+                ids.discard(tutor_id)
+                if not ids:
+                    del index[key]
+        if price is not None:
+            del self.prices[bisect_left(self.prices, (price, tutor_id))]
+
+    def _put(self, tutor):
+        if not isinstance(tutor, dict) or tutor.get("id") is None:
+            return
+        tutor_id = str(tutor["id"])
+        if tutor_id in self._keys:
+            self._unlink(tutor_id)
+        keys = (subject_keys(tutor), day_keys(tutor), price_key(tutor))
+        for index, values in self._postings(*keys):
+            for key in values:
+                index.setdefault(key, set()).add(tutor_id)
+        if keys[2] is not None:
+            insort(self.prices, (keys[2], tutor_id))
+        self._keys[tutor_id] = keys
+        self._tutors[tutor_id] = tutor  # an update keeps its place in the order
+
+    def _refresh(self):
+        version = self.store.version
+        if version == self.version:
+            return
+        with self._lock:
+            version = self.store.version
+            if version == self.version:
+                return
+            self._tutors, self._keys = {}, {}
+            self.subjects, self.days, self.bands, self.prices = {}, {}, {}, []
+            for tutor in self.store.all():
+                self._put(tutor)
+            self.version = version
+
+    def apply(self, tutor, before, after):
+        """
+        Index a tutor record this worker just wrote. `before` and `after` are
+        the store versions around the write, read under its write lock.
+        """
+        with self._lock:
+            if self.version != before:
+                return  # missed another write: the next read rebuilds anyway
+            self._put(tutor)
+            self.version = after
+
+    # ---------------------- Queries ----------------------
+    def _price_bounds(self, low, high):
+        """Bounds of the slice of self.prices with low <= price <= high (either may be None)."""
+        lo = 0 if low is None else bisect_left(self.prices, low, key=itemgetter(0))
+        hi = len(self.prices) if high is None else bisect_right(self.prices, high, key=itemgetter(0))
+        return lo, hi
+
+    def _matching(self, subjects, days, min_price, max_price):
+        """Ids passing every filter (any value within a facet), None for no filters."""
+        ids = None
+        for index, wanted in ((self.subjects, subjects), (self.days, days)):
+            if wanted:
+                found = set().union(*(index.get(key, ()) for key in wanted))
+                ids = found if ids is None else ids & found
+        if min_price is not None or max_price is not None:
+            lo, hi = self._price_bounds(min_price, max_price)
+            found = {tutor_id for _, tutor_id in self.prices[lo:hi]}
+            ids = found if ids is None else ids & found
+        return ids
+
+    def _facets(self, ids):
+        """Matches per subject, day and price band: set intersections, no per-tutor loop."""
+        facets = {}
+        for name, index in (("subjects", self.subjects), ("days", self.days), ("priceBands", self.bands)):
+            if ids is None:
+                facets[name] = {key: len(v) for key, v in index.items()}
+            else:
+                counts = ((key, len(v & ids)) for key, v in index.items())  # walks the smaller set
+                facets[name] = {key: n for key, n in counts if n}
+        return facets
+
+    def _ordered(self, ids, sort, ranked):
+        if ranked is not None:
+            order = self._ranked_first(ranked)
+        elif sort in ("price", "-price"):
+            by_price = (tutor_id for _, tutor_id in (self.prices if sort == "price" else reversed(self.prices)))
+            unpriced = (tutor_id for tutor_id, keys in self._keys.items() if keys[2] is None)
+            order = chain(by_price, unpriced)
+        else:
+            order = iter(self._tutors)
+        return order if ids is None else (tutor_id for tutor_id in order if tutor_id in ids)
+
+    def _ranked_first(self, ranked):
+        """Ids from `ranked` (consumed lazily), then every other tutor in store order."""
+        seen = set()
+        for tutor_id in ranked:
+            if tutor_id in self._tutors and tutor_id not in seen:
+                seen.add(tutor_id)
+                yield tutor_id
+        yield from (tutor_id for tutor_id in self._tutors if tutor_id not in seen)
+
+    def search(self, subjects=(), days=(), min_price=None, max_price=None, sort=None, ranked=None,
+               start=0, limit=20):
+        """
+        One page of matching tutor records, in store order, by price, or in
+        the order of `ranked` (tutor ids from an outside index, e.g. best
+        rated), with the total and the facet counts (subjects, days, price
+        bands) over all matches. Returns (records, total, facets).
+        """
+        self._refresh()
+        with self._lock:
+            ids = self._matching(subjects, days, min_price, max_price)
+            page = [self._tutors[t] for t in islice(self._ordered(ids, sort, ranked), start, start + limit)]
+            total = len(self._tutors) if ids is None else len(ids)
+            return page, total, self._facets(ids)
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from .config import Config
+from .fileio import FileLock, atomic_write_json
+
+READ_SIZE = 1024 * 1024
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class UploadError(Exception):
+    """Rejected upload request; `offset` tells the client where to resume."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class ChunkedUploads:
+    """
+    Resumable uploads kept under `folder` as <id>.part (the bytes so far) and
+    <id>.json (what the client declared at init). The part file's size is the
+    resume offset, so any worker can take the next chunk, and chunks are
+    copied from the request stream in READ_SIZE pieces: memory stays flat no
+    matter how large the file is.
+
+    The running SHA-256 of each upload is kept in memory while this process
+    sees consecutive chunks; if a chunk lands on another worker the hash is
+    rebuilt from the part file once.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        self._hashers = {}  # upload id -> [offset, sha256]
+        self._lock = threading.Lock()
+
+    # ---------------------- Paths ----------------------
+    def _path(self, upload_id, ext):
+        if not _UPLOAD_ID.match(upload_id or ""):
+            raise UploadError("Upload not found", 404)
+        return os.path.join(self.folder, f"{upload_id}.{ext}")
+
+    def _lock_for(self, upload_id):
+        return FileLock(self._path(upload_id, "part"))
+
+    def meta(self, upload_id):
+        try:
+            with open(self._path(upload_id, "json"), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UploadError("Upload not found", 404)
+
+    def _offset(self, upload_id):
+        try:
+            return os.path.getsize(self._path(upload_id, "part"))
+        except FileNotFoundError:
+            raise UploadError("Upload not found", 404)
+
+    # ---------------------- Hashing ----------------------
+    def _hasher(self, upload_id, offset):
+        """SHA-256 of the first `offset` bytes, rebuilt from disk if not cached."""
+        with self._lock:
+            entry = self._hashers.get(upload_id)
+        if entry is not None and entry[0] == offset:
+            return entry
+        sha = hashlib.sha256()
+        with open(self._path(upload_id, "part"), "rb") as f:
+            remaining = offset
+            while remaining:
+                data = f.read(min(READ_SIZE, remaining))
+                if not data:
+                    break
+                sha.update(data)
+                remaining -= len(data)
+        entry = [offset, sha]
+        with self._lock:
+            self._hashers[upload_id] = entry
+        return entry
+
+    def _forget(self, upload_id):
+        with self._lock:
+            self._hashers.pop(upload_id, None)
+
+    # ---------------------- Protocol ----------------------
+    def create(self, meta):
+        """Start an upload of meta["size"] bytes; returns its status."""
+        size = meta.get("size")
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError("size must be a positive integer")
+        if size > Config.UPLOAD_MAX_SIZE:
+            raise UploadError("File is too large", 413)
+
+        upload_id = uuid.uuid4().hex
+        meta = {**meta, "id": upload_id, "created_at": time.time()}
+        open(self._path(upload_id, "part"), "wb").close()
+        atomic_write_json(self._path(upload_id, "json"), meta)
+        self._hashers[upload_id] = [0, hashlib.sha256()]
+        return self.status(upload_id)
+
+    def status(self, upload_id):
+        meta = self.meta(upload_id)
+        return {"upload_id": upload_id, "offset": self._offset(upload_id), "size": meta["size"],
+                "chunk_size": Config.UPLOAD_CHUNK_SIZE}
+
+    def write_chunk(self, upload_id, offset, stream, length):
+        """
+        Append `length` bytes from `stream` at `offset`, which must be the
+        current end of the upload. Returns the new offset; on a dropped
+        connection whatever arrived is kept and the client resumes from there.
+        """
+        meta = self.meta(upload_id)
+        with self._lock_for(upload_id)():
+            current = self._offset(upload_id)
+            if offset != current:
+                raise UploadError("Offset does not match the upload", 409, offset=current)
+            if length is None:
+                raise UploadError("Content-Length is required", 411, offset=current)
+            if current + length > meta["size"]:
+                raise UploadError("Chunk runs past the declared size", 413, offset=current)
+
+            entry = self._hasher(upload_id, current)
+            with open(self._path(upload_id, "part"), "ab") as f:
+                remaining = length
+                try:
+                    while remaining:
+                        data = stream.read(min(READ_SIZE, remaining))
+                        if not data:
+                            break
+                        f.write(data)
+                        entry[1].update(data)
+                        entry[0] += len(data)
+                        remaining -= len(data)
+                finally:
+                    f.flush()
+                    if Config.FSYNC_WRITES:
+                        os.fsync(f.fileno())
+            return entry[0]
+
+    @contextmanager
+    def finish(self, upload_id):
+        """
+        Check the upload is complete (and matches the sha256 the client sent,
+        if any) and yield (part file path, meta, hex digest) for the caller
+        to move the file into place. The upload is discarded when the block
+        exits cleanly. Its lock is held throughout, so of two concurrent
+        finishes (say a client retry) the second gets a 409, not a part file
+        that is already gone.
+        """
+        with self._lock_for(upload_id)():
+            if not os.path.exists(self._path(upload_id, "json")):
+                raise UploadError("Upload was already finalized", 409)
+            meta = self.meta(upload_id)
+            offset = self._offset(upload_id)
+            if offset != meta["size"]:
+                raise UploadError("Upload is incomplete", 409, offset=offset)
+            digest = self._hasher(upload_id, offset)[1].hexdigest()
+            expected = (meta.get("sha256") or "").lower()
+            if expected and expected != digest:
+                self.discard(upload_id)
+                raise UploadError("Checksum mismatch, upload discarded", 422)
+            yield self._path(upload_id, "part"), meta, digest
+            self.discard(upload_id)
+
+    def discard(self, upload_id):
+        self._forget(upload_id)
+        for ext in ("part", "json", "part.lock"):
+            try:
+                os.remove(self._path(upload_id, ext))
+            except FileNotFoundError:
+                pass
+
+    def purge_stale(self, max_age):
+        """Drop uploads not written to for `max_age` seconds."""
+        cutoff = time.time() - max_age
+        for name in os.listdir(self.folder):
+            upload_id, _, ext = name.partition(".")
+            if ext != "part" or not _UPLOAD_ID.match(upload_id):
+                continue
+            try:
+                if os.path.getmtime(os.path.join(self.folder, name)) < cutoff:
+                    self.discard(upload_id)
+            except FileNotFoundError:
+                continue
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+import requests
+from flask import Flask
+from werkzeug.serving import make_server
+
+from api import fake_gateway
+from api.models import db
+from api.search import ensure_search_index
+
+
+class Gateway:
+    """api/fake_gateway.py served on a local port, with its /_control knobs."""
+
+    def __init__(self, url):
+        self.url = url
+
+    def control(self, **settings):
+        return requests.post(f"{self.url}/_control", json=settings, timeout=5).json()
+
+    @property
+    def calls(self):
+        return self.control()["calls"]
+
+
+@pytest.fixture(scope="session")
+def gateway_server():
+    server = make_server("127.0.0.1", 0, fake_gateway.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def gateway(gateway_server):
+    with fake_gateway._lock:
+        fake_gateway._state.update(fail=0, delay=0, calls=0)
+        fake_gateway._transactions.clear()
+    return Gateway(gateway_server)
+
+
+@pytest.fixture
+def app():
+    """A bare app on an in-memory database, its context pushed for the test."""
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://")
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        ensure_search_index()
+        yield app
+        db.session.remove()
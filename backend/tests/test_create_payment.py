@@ -0,0 +1,33 @@
+import pytest
+
+from api.flutterwave import FlutterwaveClient
+from api.models import Payment
+from api.routes import payments
+from api.tokens import issue_token
+
+
+@pytest.fixture
+def client(app, gateway, monkeypatch):
+    monkeypatch.setattr(payments, "flutterwave", FlutterwaveClient("test-key", gateway.url, retries=0))
+    app.register_blueprint(payments.payments_bp, url_prefix="/api/payments")
+    return app.test_client()
+
+
+ORDER = {"method": "mobile", "amount": 5000, "mobile_number": "0999000000", "userId": "someone-else"}
+
+
+def test_payment_needs_a_login(client):
+    assert client.post("/api/payments/", json=ORDER).status_code == 401
+    headers = {"Authorization": "Bearer not-a-token"}
+    assert client.post("/api/payments/", json=ORDER, headers=headers).status_code == 401
+    assert Payment.query.count() == 0
+
+
+def test_payment_belongs_to_the_token_user(client):
+    token = issue_token("student-1")
+    resp = client.post("/api/payments/", json=ORDER, headers={"Authorization": f"Bearer {token}"})
+
+    assert resp.status_code == 200
+    payment = Payment.query.filter_by(tx_ref=resp.get_json()["tx_ref"]).one()
+    assert payment.user_id == "student-1"
+    assert payment.status == "pending"
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from api.config import Config
+from api.flutterwave import CircuitBreaker, FlutterwaveClient, GatewayUnavailable
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(Config, "FLUTTERWAVE_RETRY_BACKOFF", 0)
+
+
+def client(gateway, retries=2, threshold=5, reset=30, timeout=None):
+    return FlutterwaveClient("test-key", gateway.url, timeout=timeout, retries=retries,
+                             breaker=CircuitBreaker(threshold, reset))
+
+
+def payload(tx_ref="TX-1"):
+    return {"tx_ref": tx_ref, "amount": 500, "currency": "MWK"}
+
+
+def test_create_payment(gateway):
+    resp = client(gateway).create_payment(payload())
+    assert resp["status"] == "success"
+    assert resp["data"]["link"].endswith("/pay/TX-1")
+
+
+def test_retries_through_transient_failures_without_duplicating(gateway):
+    gateway.control(fail=2)
+    resp = client(gateway, retries=2).create_payment(payload())
+
+    assert resp["status"] == "success"
+    state = gateway.control()
+    assert state["calls"] == 3  # two 503s, then the success
+    assert state["transactions"] == 1
+
+
+def test_gives_up_after_retries(gateway):
+    gateway.control(fail=10)
+    with pytest.raises(GatewayUnavailable):
+        client(gateway, retries=2).verify_by_reference("TX-1")
+    assert gateway.calls == 3  # the first attempt and both retries
+
+
+def test_read_timeout_is_retried_then_reported(gateway):
+    gateway.control(delay=0.5)
+    with pytest.raises(GatewayUnavailable):
+        client(gateway, retries=1, timeout=(1, 0.1)).verify_by_reference("TX-1")
+    assert gateway.calls == 2  # both attempts timed out
+
+
+def test_client_errors_are_not_retried(gateway):
+    resp = client(gateway).verify_by_reference("TX-unknown")
+    assert resp["status"] == "error"
+    assert gateway.calls == 1
+
+
+def test_breaker_fails_fast_while_open(gateway):
+    flw = client(gateway, retries=0, threshold=2, reset=30)
+    gateway.control(fail=2)
+    for _ in range(2):
+        with pytest.raises(GatewayUnavailable):
+            flw.verify_by_reference("TX-1")
+
+    before = gateway.calls
+    with pytest.raises(GatewayUnavailable) as excinfo:
+        flw.create_payment(payload())
+    assert gateway.calls == before  # never reached the gateway
+    assert excinfo.value.retry_after > 0
+
+
+def test_breaker_probe_closes_it_again(gateway):
+    flw = client(gateway, retries=0, threshold=1, reset=0.1)
+    gateway.control(fail=1)
+    with pytest.raises(GatewayUnavailable):
+        flw.verify_by_reference("TX-1")
+    with pytest.raises(GatewayUnavailable):
+        flw.verify_by_reference("TX-1")  # still open
+
+    time.sleep(0.15)
+    assert flw.create_payment(payload())["status"] == "success"  # the probe
+    assert flw.verify_by_reference("TX-1")["status"] == "success"
+
+
+def test_failed_probe_reopens_the_breaker(gateway):
+    flw = client(gateway, retries=0, threshold=1, reset=0.1)
+    gateway.control(fail=2)
+    with pytest.raises(GatewayUnavailable):
+        flw.verify_by_reference("TX-1")
+
+    time.sleep(0.15)
+    with pytest.raises(GatewayUnavailable):
+        flw.verify_by_reference("TX-1")  # the probe fails
+    before = gateway.calls
+    with pytest.raises(GatewayUnavailable):
+        flw.verify_by_reference("TX-1")
+    assert gateway.calls == before
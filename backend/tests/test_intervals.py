@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from api.intervals import IntervalIndex
+
+DAY = datetime(2030, 1, 7)
+
+
+def at(hour, minute=0):
+    return DAY + timedelta(hours=hour, minutes=minute)
+
+
+def bookings(*spans, key="tutor-1"):
+    index = IntervalIndex()
+    for n, (start, end) in enumerate(spans):
+        index.add(key, at(*start), at(*end), f"s{n}")
+    return index
+
+
+def test_adjacent_bookings_do_not_overlap():
+    index = bookings(((10,), (11,)))
+    assert index.overlapping("tutor-1", at(11), at(12)) == []
+    assert index.overlapping("tutor-1", at(9), at(10)) == []
+
+
+def test_overlapping_bookings_are_found():
+    index = bookings(((10,), (11,)), ((13,), (14,)))
+    assert index.overlapping("tutor-1", at(10, 30), at(11, 30)) == ["s0"]
+    assert index.overlapping("tutor-1", at(9, 30), at(10, 1)) == ["s0"]
+    assert index.overlapping("tutor-1", at(10, 15), at(10, 45)) == ["s0"]  # inside
+    assert index.overlapping("tutor-1", at(9), at(15)) == ["s0", "s1"]  # around both
+
+
+def test_long_booking_starting_much_earlier_is_found():
+    index = bookings(((8,), (12,)), ((11,), (11, 30)))
+    assert index.overlapping("tutor-1", at(11, 45), at(12, 15)) == ["s0"]
+
+
+def test_other_tutors_do_not_conflict():
+    index = bookings(((10,), (11,)))
+    assert index.overlapping("tutor-2", at(10), at(11)) == []
+
+
+def test_removed_booking_frees_the_slot():
+    index = bookings(((10,), (11,)), ((10,), (11,)))
+    assert index.remove("tutor-1", at(10), "s0")
+    assert not index.remove("tutor-1", at(10), "s0")
+    assert index.overlapping("tutor-1", at(10), at(11)) == ["s1"]
+    assert index.remove("tutor-1", at(10), "s1")
+    assert index.overlapping("tutor-1", at(10), at(11)) == []
+
+
+def test_next_free_skips_back_to_back_bookings():
+    index = bookings(((9,), (10,)), ((10,), (11,)), ((11, 30), (12,)))
+    hour = timedelta(hours=1)
+    assert index.next_free("tutor-1", at(9), hour) == at(12)  # 11:00-11:30 is too short
+    assert index.next_free("tutor-1", at(9), timedelta(minutes=30)) == at(11)
+    assert index.next_free("tutor-1", at(7), hour) == at(7)
+    assert index.next_free("tutor-2", at(9), hour) == at(9)
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from api.journal import MessageJournal
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "messages.jsonl")
+
+
+def message(n, chat="a-b", **fields):
+    return {"id": f"m{n}", "chatId": chat, "text": f"hello {n}", **fields}
+
+
+def lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def by_id(journal):
+    return {m["id"]: m for m in journal.all()}
+
+
+def test_edits_and_deletes_are_appended(path):
+    journal = MessageJournal(path, "chatId")
+    for n in range(3):
+        journal.insert(message(n))
+    journal.update("id", "m1", {"text": "edited"})
+    journal.delete("id", "m2")
+
+    assert [entry["op"] for entry in lines(path)] == ["put", "put", "put", "edit", "delete"]
+    assert by_id(journal) == {"m0": message(0), "m1": message(1, text="edited")}
+    assert journal.dead_entries == 3
+
+
+def test_other_workers_see_appended_writes(path):
+    writer, reader = MessageJournal(path, "chatId"), MessageJournal(path, "chatId")
+    writer.insert(message(0))
+    writer.insert(message(1, chat="c-d"))
+    writer.update("id", "m0", {"text": "edited"})
+
+    assert reader.get("id", "m0")["text"] == "edited"
+    assert [m["id"] for m in reader.filter("chatId", "c-d")] == ["m1"]
+
+
+def test_half_written_line_waits_for_the_rest(path):
+    journal = MessageJournal(path, "chatId")
+    journal.insert(message(0))
+    line = json.dumps({"op": "put", "record": message(1)})
+    with open(path, "a") as f:
+        f.write(line[:10])
+    assert list(by_id(journal)) == ["m0"]
+
+    with open(path, "a") as f:
+        f.write(line[10:] + "\n")
+    assert list(by_id(journal)) == ["m0", "m1"]
+
+
+def test_compaction_keeps_edits_and_drops_deletes(path):
+    journal = MessageJournal(path, "chatId")
+    other = MessageJournal(path, "chatId")  # another worker, open across the compaction
+    for n in range(6):
+        journal.insert(message(n))
+    for n in (1, 3):
+        journal.update("id", f"m{n}", {"text": f"edited {n}"})
+    for n in (0, 4):
+        journal.delete("id", f"m{n}")
+    before = by_id(journal)
+    assert other.all()  # `other` has read the pre-compaction log
+
+    assert journal.compact(min_dead=1)
+
+    assert lines(path) == [{"op": "put", "record": m} for m in before.values()]
+    assert journal.dead_entries == 0
+    assert by_id(journal) == before
+    assert by_id(other) == before
+    assert by_id(MessageJournal(path, "chatId")) == before
+
+    # writes after the compaction reach the worker that was open before it
+    journal.update("id", "m3", {"text": "again"})
+    journal.delete("id", "m5")
+    assert other.get("id", "m3")["text"] == "again"
+    assert other.get("id", "m5") is None
+
+
+def test_compaction_waits_for_enough_dead_lines(path):
+    journal = MessageJournal(path, "chatId")
+    for n in range(4):
+        journal.insert(message(n))
+    journal.delete("id", "m0")  # the deleted put and its tombstone are dead
+
+    assert not journal.compact(min_dead=5)
+    assert not journal.compact(min_dead=1)  # two dead lines, three live records
+    assert len(lines(path)) == 5
+
+
+def test_legacy_array_is_imported_once(tmp_path, path):
+    legacy = tmp_path / "messages.json"
+    legacy.write_text(json.dumps([message(0), message(1)]))
+
+    journal = MessageJournal(path, "chatId", legacy_path=str(legacy))
+    journal.delete("id", "m0")
+    legacy.write_text(json.dumps([message(0), message(1), message(2)]))
+
+    assert list(by_id(MessageJournal(path, "chatId", legacy_path=str(legacy)))) == ["m1"]
@@ -0,0 +1,133 @@
+import socket
+import threading
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+from flask import Flask
+from flask_mail import Mail, Message
+
+from api.config import Config
+from api.mailqueue import MailQueue
+
+
+class Inbox:
+    """aiosmtpd handler keeping every delivered message and the connection it came over."""
+
+    def __init__(self):
+        self.delivered = []  # (client address, envelope)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bounce@"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.append((session.peer, envelope))
+        return "250 Message accepted"
+
+    def recipients(self):
+        return sorted(to for _, envelope in self.delivered for to in envelope.rcpt_tos)
+
+    def connections(self):
+        return {peer for peer, _ in self.delivered}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_flushed(mail_queue, timeout=10):
+    done = threading.Thread(target=mail_queue.flush, daemon=True)
+    done.start()
+    done.join(timeout)
+    assert not done.is_alive(), "mail queue did not drain"
+
+
+@pytest.fixture
+def port():
+    return free_port()
+
+
+@pytest.fixture
+def inbox(port):
+    handler = Inbox()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def app(port, monkeypatch):
+    monkeypatch.setattr(Config, "MAIL_RETRY_BACKOFF", 0.05)
+    app = Flask(__name__)
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=port, MAIL_DEFAULT_SENDER="noreply@example.com")
+    Mail(app)
+    return app
+
+
+def send_all(app, mail_queue, recipients):
+    with app.app_context():
+        for to in recipients:
+            mail_queue.send(Message("Hello", recipients=[to], body=f"Hi {to}"))
+
+
+def test_batch_is_sent_over_one_connection(app, inbox):
+    mail_queue = MailQueue()
+    recipients = [f"user{i}@example.com" for i in range(Config.MAIL_BATCH_SIZE + 5)]
+    send_all(app, mail_queue, recipients)
+    wait_flushed(mail_queue)
+
+    assert inbox.recipients() == sorted(recipients)
+    assert len(inbox.connections()) == 1
+
+
+def test_idle_connection_is_closed_and_reopened(app, inbox, monkeypatch):
+    monkeypatch.setattr(Config, "MAIL_IDLE_TIMEOUT", 0.1)
+    mail_queue = MailQueue()
+    send_all(app, mail_queue, ["first@example.com"])
+    wait_flushed(mail_queue)
+    time.sleep(0.3)
+    send_all(app, mail_queue, ["second@example.com"])
+    wait_flushed(mail_queue)
+
+    assert inbox.recipients() == ["first@example.com", "second@example.com"]
+    assert len(inbox.connections()) == 2
+
+
+def test_rejected_message_is_dropped_and_the_rest_delivered(app, inbox):
+    mail_queue = MailQueue()
+    send_all(app, mail_queue, ["a@example.com", "bounce@example.com", "b@example.com"])
+    wait_flushed(mail_queue)
+
+    assert inbox.recipients() == ["a@example.com", "b@example.com"]
+
+
+def test_mail_is_retried_until_the_server_is_back(app, port):
+    mail_queue = MailQueue()
+    send_all(app, mail_queue, ["late@example.com"])
+    time.sleep(0.2)  # first attempts hit a closed port
+
+    handler = Inbox()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        wait_flushed(mail_queue)
+    finally:
+        controller.stop()
+
+    assert handler.recipients() == ["late@example.com"]
+
+
+def test_gives_up_after_max_retries(app, monkeypatch):
+    monkeypatch.setattr(Config, "MAIL_MAX_RETRIES", 2)
+    monkeypatch.setattr(Config, "MAIL_RETRY_BACKOFF", 0.01)
+    mail_queue = MailQueue()
+    send_all(app, mail_queue, ["nobody@example.com"])
+
+    # nothing listens on the port: the queue must still drain
+    wait_flushed(mail_queue)
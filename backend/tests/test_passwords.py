@@ -0,0 +1,30 @@
+import threading
+
+import eventlet
+from flask import Flask
+from flask_socketio import SocketIO
+
+from api.config import Config
+from api.passwords import check_password, hash_password
+
+
+def test_concurrent_checks_on_os_threads(monkeypatch):
+    """eventlet is installed, so Socket.IO runs in eventlet mode, but a threaded server never patches"""
+    monkeypatch.setattr(Config, "BCRYPT_ROUNDS", 4)
+    app = Flask(__name__)
+    assert SocketIO(app).async_mode == "eventlet"
+    hashed = hash_password("secret")
+    results = []
+
+    def login():
+        with app.app_context():
+            results.append(check_password("secret", hashed))
+
+    threads = [threading.Thread(target=login, daemon=True) for _ in range(Config.PASSWORD_HASH_WORKERS + 2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+
+    assert results == [True] * len(threads)
+    assert eventlet.patcher.is_monkey_patched("thread") is False
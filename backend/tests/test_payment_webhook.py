@@ -0,0 +1,60 @@
+import pytest
+
+from api.models import db, Payment
+from api.routes import payments
+
+SECRET_HASH = "test-secret-hash"
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    monkeypatch.setattr(payments, "FLUTTERWAVE_SECRET_HASH", SECRET_HASH)
+    app.register_blueprint(payments.payments_bp, url_prefix="/api/payments")
+    return app.test_client()
+
+
+def deliver(client, tx_ref, status):
+    return client.post("/api/payments/webhook", headers={"verif-hash": SECRET_HASH},
+                       json={"event": "charge.completed", "data": {"id": 7, "tx_ref": tx_ref, "status": status}})
+
+
+def status_of(tx_ref):
+    db.session.expire_all()
+    return Payment.query.filter_by(tx_ref=tx_ref).one().status
+
+
+def test_unsigned_webhook_is_rejected(client):
+    resp = client.post("/api/payments/webhook", json={"data": {"tx_ref": "TX-1", "status": "successful"}})
+    assert resp.status_code == 401
+    assert Payment.query.count() == 0
+
+
+def test_webhook_settles_a_pending_payment(client):
+    db.session.add(Payment(tx_ref="TX-1", amount=500, currency="MWK", status="pending"))
+    db.session.commit()
+
+    assert deliver(client, "TX-1", "successful").status_code == 200
+    assert status_of("TX-1") == "completed"
+
+
+def test_late_failure_does_not_undo_a_completed_payment(client):
+    deliver(client, "TX-1", "successful")
+    deliver(client, "TX-1", "failed")  # out of order, or replayed from an earlier attempt
+
+    assert status_of("TX-1") == "completed"
+    assert Payment.query.one().gateway_status == "successful"
+
+
+def test_failed_payment_stays_failed(client):
+    deliver(client, "TX-1", "failed")
+    deliver(client, "TX-1", "successful")
+
+    assert status_of("TX-1") == "failed"
+
+
+def test_late_webhook_settles_an_abandoned_checkout(client):
+    db.session.add(Payment(tx_ref="TX-1", amount=500, currency="MWK", status="abandoned"))
+    db.session.commit()
+
+    deliver(client, "TX-1", "successful")
+    assert status_of("TX-1") == "completed"
@@ -0,0 +1,67 @@
+import pytest
+
+from api.models import db, TutorRating
+from api.ratings import NO_REVIEWS, best_rated, rating_summaries, ratings_version, rebuild_ratings, record_review
+
+REVIEWS = [
+    {"tutorId": 1, "rating": 5},
+    {"tutorId": 1, "rating": 4},
+    {"tutorId": 1, "rating": 2.6},
+    {"tutorId": "b7", "rating": 4},
+    {"tutorId": "b7", "rating": 4},
+    {"tutorId": "c9", "rating": 4},
+]
+
+
+def review_all(reviews):
+    for review in reviews:
+        record_review(review["tutorId"], review["rating"])
+        db.session.commit()
+
+
+def test_each_review_updates_its_tutor(app):
+    review_all(REVIEWS[:3])
+    summary = rating_summaries()["1"]
+
+    assert summary["reviewsCount"] == 3
+    assert summary["rating"] == pytest.approx((5 + 4 + 2.6) / 3, abs=0.01)
+    assert summary["ratingHistogram"] == {"1": 0, "2": 0, "3": 1, "4": 1, "5": 1}
+
+
+def test_incremental_aggregates_match_a_full_recompute(app):
+    review_all(REVIEWS)
+    incremental = rating_summaries()
+
+    assert rebuild_ratings(REVIEWS) == 3
+    assert rating_summaries() == incremental
+    assert TutorRating.query.count() == 3
+
+
+def test_recompute_skips_malformed_reviews(app):
+    review_all([{"tutorId": 1, "rating": 3}])
+    rebuild_ratings([{"tutorId": 2, "rating": 5}, {"tutorId": 2, "rating": "n/a"}, {"rating": 4}, {"tutorId": 3}])
+
+    assert list(rating_summaries()) == ["2"]  # tutor 1's old aggregate is replaced
+    assert rating_summaries()["2"]["reviewsCount"] == 1
+
+
+def test_best_rated_breaks_ties_by_review_count(app):
+    review_all(REVIEWS)
+    assert list(best_rated()) == ["b7", "c9", "1"]
+
+
+def test_summaries_for_some_tutors(app):
+    review_all(REVIEWS)
+    assert set(rating_summaries([1, "c9", "nobody"])) == {"1", "c9"}
+    assert rating_summaries(["nobody"]).get("nobody", NO_REVIEWS) == NO_REVIEWS
+
+
+def test_every_review_moves_the_version(app):
+    versions = [ratings_version()]
+    for review in REVIEWS[:2]:
+        review_all([review])
+        versions.append(ratings_version())
+    rebuild_ratings(REVIEWS)
+    versions.append(ratings_version())
+
+    assert len(set(versions)) == len(versions)
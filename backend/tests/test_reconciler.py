@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from api.config import Config
+from api.flutterwave import CircuitBreaker, FlutterwaveClient, GatewayError
+from api.models import db, Payment
+from api.routes import payments
+
+
+@pytest.fixture
+def flw(gateway, monkeypatch):
+    client = FlutterwaveClient("test-key", gateway.url, retries=0, breaker=CircuitBreaker(100, 30))
+    monkeypatch.setattr(payments, "flutterwave", client)
+    return client
+
+
+def start_payment(flw, tx_ref, **fields):
+    """A checkout the gateway knows about, with its pending ledger row."""
+    flw.create_payment({"tx_ref": tx_ref, "amount": 500, "currency": "MWK"})
+    payment = Payment(tx_ref=tx_ref, amount=500, currency="MWK", status="pending", **fields)
+    db.session.add(payment)
+    db.session.commit()
+    return payment
+
+
+def statuses():
+    return {p.tx_ref: p.status for p in Payment.query}
+
+
+def test_settles_finished_payments_and_leaves_the_rest(app, gateway, flw):
+    for tx_ref in ("TX-paid", "TX-declined", "TX-open"):
+        start_payment(flw, tx_ref)
+    gateway.control(settle="TX-paid")
+    gateway.control(settle="TX-declined", status="failed")
+
+    assert payments.reconcile_payments() == 2
+    assert statuses() == {"TX-paid": "completed", "TX-declined": "failed", "TX-open": "pending"}
+    assert Payment.query.filter_by(tx_ref="TX-paid").one().gateway_status == "successful"
+
+
+def test_recently_checked_payments_wait_for_the_next_interval(app, gateway, flw):
+    start_payment(flw, "TX-open")
+    payments.reconcile_payments()
+    before = gateway.calls
+
+    payments.reconcile_payments()
+    assert gateway.calls == before
+
+
+def test_one_bad_answer_does_not_abort_the_batch(app, gateway, flw, monkeypatch):
+    start_payment(flw, "TX-bad")
+    start_payment(flw, "TX-paid")
+    gateway.control(settle="TX-paid")
+    verify = flw.verify_by_reference
+
+    def flaky_verify(tx_ref):
+        if tx_ref == "TX-bad":
+            raise GatewayError("Invalid response from gateway (HTTP 200)")
+        return verify(tx_ref)
+
+    monkeypatch.setattr(flw, "verify_by_reference", flaky_verify)
+
+    assert payments.reconcile_payments() == 1
+    assert statuses() == {"TX-bad": "pending", "TX-paid": "completed"}
+
+
+def test_gateway_outage_leaves_payments_pending(app, gateway, flw):
+    start_payment(flw, "TX-paid")
+    gateway.control(settle="TX-paid", fail=10)
+
+    assert payments.reconcile_payments() == 0
+    assert statuses() == {"TX-paid": "pending"}
+
+
+def test_stale_checkouts_are_abandoned_without_asking_the_gateway(app, gateway, flw):
+    old = datetime.utcnow() - timedelta(hours=Config.PAYMENT_PENDING_MAX_HOURS + 1)
+    start_payment(flw, "TX-stale", created_at=old)
+    before = gateway.calls
+
+    payments.reconcile_payments()
+    assert statuses() == {"TX-stale": "abandoned"}
+    assert gateway.calls == before
@@ -0,0 +1,66 @@
+from api.models import db, TutorPaper, TutorVideo
+from api.search import match_expression, rebuild_search_index, search
+
+
+def video(title, **fields):
+    return TutorVideo(tutor_id="t1", title=title, uploader="Mr Banda", url=f"{title}.mp4", **fields)
+
+
+def paper(title, **fields):
+    return TutorPaper(tutor_id="t1", title=title, uploader="Mrs Phiri", url=f"{title}.pdf", **fields)
+
+
+def found(q, **kwargs):
+    hits, _ = search(match_expression(q), **kwargs)
+    return [(kind, item_id) for kind, item_id, _ in hits]
+
+
+def add(*items):
+    db.session.add_all(items)
+    db.session.commit()
+    return items
+
+
+def test_new_uploads_are_searchable_by_prefix(app):
+    v, p = add(video("Algebra basics", subject="Maths"), paper("Algorithms past paper", subject="Computing"))
+    assert sorted(found("alg")) == [("paper", p.id), ("video", v.id)]
+    assert found("alg", kind="video") == [("video", v.id)]
+    assert found("banda") == [("video", v.id)]
+
+
+def test_edits_reindex_the_row(app):
+    v, = add(video("Algebra basics"))
+    v.title = "Geometry basics"
+    db.session.commit()
+
+    assert found("algebra") == []
+    assert found("geometry") == [("video", v.id)]
+
+
+def test_deleted_rows_leave_the_index(app):
+    v, p = add(video("Algebra basics"), paper("Algebra past paper"))
+    db.session.delete(v)
+    db.session.commit()
+
+    assert found("algebra") == [("paper", p.id)]
+    assert db.session.execute(db.text("SELECT count(*) FROM catalog_fts")).scalar() == 1
+
+
+def test_title_hits_rank_first_and_pages_do_not_repeat(app):
+    items = add(*[video(f"Lesson {n}", description="chemistry revision") for n in range(5)],
+                video("Chemistry lesson"))
+    hits, last = search(match_expression("chem"), limit=2)
+    assert hits[0][1] == items[-1].id
+
+    seen = [item_id for _, item_id, _ in hits]
+    while last:
+        hits, last = search(match_expression("chem"), limit=2, after=last)
+        seen += [item_id for _, item_id, _ in hits]
+    assert sorted(seen) == sorted(item.id for item in items)
+
+
+def test_rebuild_matches_the_incremental_index(app):
+    add(video("Algebra basics"), paper("Algebra past paper"), video("Biology"))
+    before = sorted(found("algebra"))
+    rebuild_search_index()
+    assert sorted(found("algebra")) == before
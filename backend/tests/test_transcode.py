@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from api import transcode
+from api.config import Config
+from api.models import db, TutorVideo
+
+
+@pytest.fixture
+def hanging_ffmpeg(tmp_path, monkeypatch):
+    """An "ffmpeg" that never finishes, as on some malformed uploads."""
+    exe = tmp_path / "ffmpeg"
+    exe.write_text("#!/bin/sh\nexec sleep 30\n")
+    exe.chmod(0o755)
+    monkeypatch.setattr(transcode, "ffmpeg_exe", lambda: str(exe))
+    monkeypatch.setattr(Config, "TRANSCODE_PROBE_TIMEOUT", 0.5)
+    monkeypatch.setattr(Config, "HLS_FOLDER", str(tmp_path / "hls"))
+    return exe
+
+
+def test_hung_ffmpeg_is_killed(hanging_ffmpeg, tmp_path):
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="timed out"):
+        transcode.transcode(str(tmp_path / "in.mp4"), str(tmp_path / "out"))
+    assert time.monotonic() - started < 5
+
+
+def test_timed_out_job_is_marked_failed(app, hanging_ffmpeg):
+    video = TutorVideo(tutor_id="t1", title="Algebra", uploader="Tutor", url="algebra.mp4")
+    db.session.add(video)
+    db.session.commit()
+    transcoder = transcode.Transcoder()
+    transcoder.app = app
+
+    transcoder.enqueue(video)
+    deadline = time.monotonic() + 10
+    while video.transcode_status == "processing" and time.monotonic() < deadline:
+        time.sleep(0.1)
+        db.session.expire_all()
+
+    assert video.transcode_status == "failed"
+    assert "timed out" in video.transcode_error
+    assert transcoder.dispatch() == 0  # a failed job is not claimed again
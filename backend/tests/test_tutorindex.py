@@ -0,0 +1,83 @@
+import pytest
+
+from api.store import JsonStore
+from api.tutorindex import TutorIndex
+
+TUTORS = [
+    {"id": 1, "subjects": ["Maths", "Physics"], "availability": ["Mon-Morning", "Wed-Evening"], "price": "3,000"},
+    {"id": "b7", "subjects": "chemistry, maths", "availability": ["Tuesday"], "price": 12000},
+    {"id": 3, "subjects": ["Biology"], "availability": ["Mon-Evening"], "price": "ask me"},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JsonStore(str(tmp_path / "tutors.json"), indexes=("id",))
+    store.save([dict(t) for t in TUTORS])
+    return store
+
+
+def ids(result):
+    return [str(t["id"]) for t in result[0]]
+
+
+def test_filters_and_facets(store):
+    index = TutorIndex(store)
+    tutors, total, facets = index.search(subjects=["maths"])
+    assert ([str(t["id"]) for t in tutors], total) == (["1", "b7"], 2)
+    assert facets["subjects"] == {"maths": 2, "physics": 1, "chemistry": 1}
+    assert facets["priceBands"] == {"2000-5000": 1, "10000-20000": 1}
+
+    assert ids(index.search(days=["Mon"], subjects=["maths", "biology"])) == ["1", "3"]
+    assert ids(index.search(min_price=2000, max_price=12000)) == ["1", "b7"]
+    assert ids(index.search(min_price=3001)) == ["b7"]
+    assert index.search()[1] == 3
+
+
+def test_price_order_puts_unpriced_tutors_last(store):
+    index = TutorIndex(store)
+    assert ids(index.search(sort="price")) == ["1", "b7", "3"]
+    assert ids(index.search(sort="-price")) == ["b7", "1", "3"]
+    assert ids(index.search(sort="price", start=1, limit=1)) == ["b7"]
+
+
+def test_local_write_updates_the_index_in_place(store):
+    index = TutorIndex(store)
+    index.search()
+    with store.write_lock():
+        before = store.version
+        tutor = store.update("id", 1, {"subjects": ["History"], "price": 25000})
+        index.apply(tutor, before, store.version)
+
+    assert ids(index.search(subjects=["maths"])) == ["b7"]
+    assert ids(index.search(subjects=["history"])) == ["1"]
+    assert index.search()[2]["priceBands"] == {"20000+": 1, "10000-20000": 1}
+
+
+def test_delete_by_another_worker_drops_the_tutor(store):
+    index = TutorIndex(store)
+    assert index.search(subjects=["maths"])[1] == 2
+
+    JsonStore(store.path, indexes=("id",)).delete("id", "b7")  # another worker's store
+
+    tutors, total, facets = index.search(subjects=["maths"])
+    assert ([str(t["id"]) for t in tutors], total) == (["1"], 1)
+    assert "chemistry" not in facets["subjects"]
+    assert index.search(sort="-price")[0][0]["id"] == 1
+
+
+def test_missed_write_forces_a_rebuild(store):
+    index = TutorIndex(store)
+    index.search()
+    JsonStore(store.path, indexes=("id",)).insert({"id": 4, "subjects": ["Maths"], "price": 100})
+    with store.write_lock():
+        before = store.version  # already past the other worker's insert
+        tutor = store.insert({"id": 5, "subjects": ["Maths"], "price": 200})
+        index.apply(tutor, before, store.version)
+
+    assert ids(index.search(subjects=["maths"])) == ["1", "b7", "4", "5"]
+
+
+def test_ranked_order_then_everyone_else(store):
+    index = TutorIndex(store)
+    assert ids(index.search(ranked=iter(["3", "gone", "1"]))) == ["3", "1", "b7"]
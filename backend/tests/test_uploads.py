@@ -0,0 +1,116 @@
+import hashlib
+import io
+import os
+import threading
+
+import pytest
+
+from api.uploads import ChunkedUploads, UploadError
+
+DATA = os.urandom(300_000)
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    return ChunkedUploads(str(tmp_path / "partial"))
+
+
+def upload(uploads, data=DATA, **meta):
+    upload_id = uploads.create({"size": len(data), **meta})["upload_id"]
+    uploads.write_chunk(upload_id, 0, io.BytesIO(data), len(data))
+    return upload_id
+
+
+def test_chunk_at_the_wrong_offset_is_refused(uploads):
+    upload_id = uploads.create({"size": len(DATA)})["upload_id"]
+    assert uploads.write_chunk(upload_id, 0, io.BytesIO(DATA[:1000]), 1000) == 1000
+
+    for offset in (0, 999, 1001, 5000):
+        with pytest.raises(UploadError) as excinfo:
+            uploads.write_chunk(upload_id, offset, io.BytesIO(DATA[offset:offset + 10]), 10)
+        assert (excinfo.value.status, excinfo.value.offset) == (409, 1000)
+    assert uploads.status(upload_id)["offset"] == 1000
+
+
+def test_dropped_chunk_resumes_from_what_arrived(uploads):
+    upload_id = uploads.create({"size": len(DATA), "sha256": hashlib.sha256(DATA).hexdigest()})["upload_id"]
+    # the client claimed 200 kB but the connection dropped after 50 kB
+    assert uploads.write_chunk(upload_id, 0, io.BytesIO(DATA[:50_000]), 200_000) == 50_000
+    fresh = ChunkedUploads(uploads.folder)  # the next chunk lands on another worker
+    assert fresh.status(upload_id)["offset"] == 50_000
+    fresh.write_chunk(upload_id, 50_000, io.BytesIO(DATA[50_000:]), len(DATA) - 50_000)
+
+    with fresh.finish(upload_id) as (part_path, meta, digest):
+        assert digest == hashlib.sha256(DATA).hexdigest()
+
+
+def test_chunk_past_the_declared_size_is_refused(uploads):
+    upload_id = uploads.create({"size": 100})["upload_id"]
+    with pytest.raises(UploadError) as excinfo:
+        uploads.write_chunk(upload_id, 0, io.BytesIO(DATA[:101]), 101)
+    assert (excinfo.value.status, excinfo.value.offset) == (413, 0)
+
+
+def test_incomplete_upload_cannot_finish(uploads):
+    upload_id = uploads.create({"size": len(DATA)})["upload_id"]
+    uploads.write_chunk(upload_id, 0, io.BytesIO(DATA[:10]), 10)
+    with pytest.raises(UploadError) as excinfo:
+        with uploads.finish(upload_id):
+            pass
+    assert (excinfo.value.status, excinfo.value.offset) == (409, 10)
+
+
+def test_checksum_mismatch_discards_the_upload(uploads):
+    upload_id = upload(uploads, sha256="0" * 64)
+    with pytest.raises(UploadError) as excinfo:
+        with uploads.finish(upload_id):
+            pass
+    assert excinfo.value.status == 422
+    assert os.listdir(uploads.folder) == []
+
+
+def test_finish_yields_the_file_and_its_digest(uploads, tmp_path):
+    upload_id = upload(uploads, sha256=hashlib.sha256(DATA).hexdigest())
+    target = tmp_path / "done"
+    with uploads.finish(upload_id) as (part_path, meta, digest):
+        os.replace(part_path, target)
+
+    assert digest == hashlib.sha256(DATA).hexdigest()
+    assert target.read_bytes() == DATA
+    assert os.listdir(uploads.folder) == []
+
+
+def test_concurrent_finish_lets_one_through(uploads, tmp_path):
+    upload_id = upload(uploads)
+    inside = threading.Event()
+    results = []
+
+    def finalize(name):
+        try:
+            with uploads.finish(upload_id) as (part_path, meta, digest):
+                inside.set()
+                threading.Event().wait(0.2)  # a slow move into the blob store
+                os.replace(part_path, tmp_path / name)
+            results.append("ok")
+        except UploadError as e:
+            results.append(e.status)
+
+    first = threading.Thread(target=finalize, args=("first",))
+    first.start()
+    inside.wait(5)
+    second = threading.Thread(target=finalize, args=("second",))
+    second.start()
+    first.join(5)
+    second.join(5)
+
+    assert results == ["ok", 409]
+    assert (tmp_path / "first").read_bytes() == DATA
+
+
+def test_failed_move_keeps_the_upload_for_a_retry(uploads):
+    upload_id = upload(uploads)
+    with pytest.raises(OSError):
+        with uploads.finish(upload_id):
+            raise OSError("disk full")
+
+    assert uploads.status(upload_id)["offset"] == len(DATA)
@@ -46,7 +46,10 @@ function Payment() {
     try {
       const res = await fetch("https://tutorbackend-tr3q.onrender.com/api/payments", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: {
+          "Content-Type": "application/json",
+          Authorization: `Bearer ${localStorage.getItem("token")}`
+        },
         body: JSON.stringify(payload)
       });
       const data = await res.json();
@@ -1,6 +1,7 @@
 // src/pages/TutorSessions.js
 import React, { useState, useEffect } from "react";
 import axios from "axios";
+import { io } from "socket.io-client";
 import Navbar from "../components/Navbar";
 import SessionActions from "../components/ApprovedSessionActions";
 
@@ -37,9 +38,18 @@ export default function TutorSessions() {
 
     fetchSessions();
 
-    // Optional: poll for updates every 10s
-    const interval = setInterval(fetchSessions, 10000);
-    return () => clearInterval(interval);
+    // Live updates: the backend pushes new bookings and status changes
+    const socket = io(BASE_URL, { transports: ["websocket"], path: "/socket.io" });
+    socket.on("connect", () =>
+      socket.emit("subscribe-sessions", { token: localStorage.getItem("token") })
+    );
+    socket.on("session-created", ({ session }) =>
+      setSessions((prev) => (prev.some((s) => s.id === session.id) ? prev : [...prev, session]))
+    );
+    socket.on("session-updated", ({ session }) =>
+      setSessions((prev) => prev.map((s) => (s.id === session.id ? session : s)))
+    );
+    return () => socket.disconnect();
   }, [tutorUserId, role]);
 
   const updateSessionStatus = async (id, status) => {